@@ -0,0 +1,83 @@
+"""Compares the peak memory and time of keeping test runs (`columnar.TestRuns`) with aggregating them as they are
+collected (`aggregate.SpillingAggregates`, as `health --stream` does), over long histories.
+
+Run with:
+
+    python benchmarks/bench_aggregate.py [--builds 1000 5000] [--tests 2000] [--failure-rate 0.02]
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+from myjenkins.aggregate import SpillingAggregates
+from myjenkins.columnar import TestRuns
+
+
+def synthetic_trees(n_builds, n_tests, failure_rate, builds_per_revision=3, seed=0):
+    """Yield the test runs of ``n_builds`` build trees, newest first, as `report.tree_test_runs` does."""
+    rng = random.Random(seed)
+    tests = ['com.example.Test{0}.test'.format(i) for i in range(n_tests)]
+
+    for build in range(n_builds, 0, -1):
+        commit = build // builds_per_revision
+        branch, revision = 'feature/{0}'.format(commit % 20), '{0:040x}'.format(commit)
+        yield [(test, branch, revision, int(not failed), int(failed), float(build), 'job', build)
+               for test, failed in ((t, rng.random() < failure_rate) for t in tests)]
+
+
+def measure(f, trees, *args):
+    """Time ``f``, then run it again tracing its peak memory (which slows it down)."""
+    start = time.perf_counter()
+    result = f(trees(), *args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    f(trees(), *args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, elapsed, peak / 1024.0 ** 2
+
+
+def keep(trees):
+    runs = TestRuns()
+    for tree in trees:
+        for run in tree:
+            runs.append(*run)
+
+    return len(runs.breakdown())
+
+
+def stream(trees, max_groups):
+    with tempfile.TemporaryDirectory() as directory:
+        aggregates = SpillingAggregates(directory, max_groups=max_groups)
+        for tree in trees:
+            aggregates.add_runs(tree)
+
+        return len(aggregates.breakdown())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--builds', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--tests', type=int, default=2000)
+    parser.add_argument('--failure-rate', type=float, default=0.02)
+    parser.add_argument('--max-groups', type=int, default=250000)
+    args = parser.parse_args()
+
+    print('{0:>8} {1:>10} {2:>10} {3:>9} {4:>10} {5:>11} {6:>11}'.format(
+        'builds', 'runs', 'flaky', 'keep (s)', 'keep (MiB)', 'stream (s)', 'stream (MiB)'))
+    for n in args.builds:
+        trees = lambda: synthetic_trees(n, args.tests, args.failure_rate)
+        kept, keep_time, keep_peak = measure(keep, trees)
+        streamed, stream_time, stream_peak = measure(stream, trees, args.max_groups)
+        assert kept == streamed
+
+        print('{0:>8} {1:>10} {2:>10} {3:>9.2f} {4:>10.1f} {5:>11.2f} {6:>11.1f}'.format(
+            n, n * args.tests, kept, keep_time, keep_peak, stream_time, stream_peak))
+
+
+if __name__ == '__main__':
+    main()
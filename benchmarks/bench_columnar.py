@@ -0,0 +1,67 @@
+"""Times saving `columnar.TestRuns`, and loading (memory-mapping) and breaking them down again, as `health --dump`
+and `health --from-file` do.
+
+Run with:
+
+    python benchmarks/bench_columnar.py [--sizes 1000000 10000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+from myjenkins.columnar import STRING_COLUMNS, StringTable, TestRuns
+
+
+def synthetic_runs(n, n_tests=5000, n_branches=20, n_jobs=30, seed=0):
+    """``n`` test runs spread over ``n_tests`` tests, ``n_branches`` branches and ``n_jobs`` jobs."""
+    rng = np.random.RandomState(seed)
+    runs = TestRuns()
+    sizes = {'test': n_tests, 'branch': n_branches, 'revision': 1, 'job': n_jobs}
+    names = {'test': 'com.example.Test{0}.test', 'branch': 'feature/{0}', 'revision': '?', 'job': 'pipeline-{0}'}
+
+    # Filled in column by column; appending run by run would take minutes
+    for key in STRING_COLUMNS:
+        runs.tables[key] = StringTable(names[key].format(i) for i in range(sizes[key]))
+        runs.codes[key] = array('i', rng.randint(sizes[key], size=n).astype(np.int32).tobytes())
+
+    runs.failure = array('b', (rng.random_sample(n) < 0.05).astype(np.int8).tobytes())
+    runs.timestamp = array('d', rng.randint(10 ** 9, size=n).astype(np.float64).tobytes())
+    runs.build = array('i', rng.randint(1000, size=n).astype(np.int32).tobytes())
+    runs.builds.update(dict((j, 1000) for j in runs.tables['job'].strings))
+
+    return runs
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000000, 10000000])
+    args = parser.parse_args()
+
+    print('{0:>10} {1:>10} {2:>9} {3:>9} {4:>14} {5:>10}'.format(
+        'runs', 'file (MiB)', 'save (s)', 'load (s)', 'breakdown (s)', 'flaky'))
+    for n in args.sizes:
+        runs = synthetic_runs(n)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'runs.npz')
+            _, save = timed(runs.save, path)
+            loaded, load = timed(TestRuns.load, path)
+            breakdown, analyse = timed(loaded.breakdown)
+
+            print('{0:>10} {1:>10.1f} {2:>9.2f} {3:>9.2f} {4:>14.2f} {5:>10}'.format(
+                n, os.path.getsize(path) / 1024.0 ** 2, save, load, analyse, len(breakdown)))
+            del loaded, breakdown # Unmap before the file goes
+
+
+if __name__ == '__main__':
+    main()
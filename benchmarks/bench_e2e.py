@@ -0,0 +1,86 @@
+"""Times myjenkins commands end to end against a fake Jenkins server.
+
+For each of `health`, `summary` and `retry` this reports the requests the
+server saw, wall time and peak Python memory. Run with e.g.:
+
+    python benchmarks/bench_e2e.py --builds 50 --fan-out 4 2 --tests 200 --latency 0.02 -- --engine async
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from click.testing import CliRunner
+
+from myjenkins.__main__ import myjenkins
+from myjenkins.testing.fake_server import FakeJenkins
+
+
+def run(fake, options, command):
+    """Run a myjenkins command. Returns its output and the measurements."""
+    fake.reset_stats()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    result = CliRunner().invoke(myjenkins, ['--hostname', fake.url] + options + command)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if result.exception:
+        raise result.exception
+
+    stats = fake.stats()
+    return result.output, {
+        'command': ' '.join(command),
+        'requests': stats['total_requests'],
+        'bytes': stats['total_bytes'],
+        'requests_by_endpoint': stats['requests'],
+        'wall_time': elapsed,
+        'peak_memory': peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--builds', type=int, default=20)
+    parser.add_argument('--fan-out', type=int, nargs='+', default=[4, 2], help='subbuilds per level')
+    parser.add_argument('--tests', type=int, default=100, help='tests per leaf build')
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    parser.add_argument('--payload', type=int, default=200, help='bytes of stdout per test case')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds added to each request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of build requests that 500')
+    parser.add_argument('--json', action='store_true', help='print measurements as JSON')
+    parser.add_argument('options', nargs='*', help='extra myjenkins options (after --)')
+    args = parser.parse_args()
+
+    fake = FakeJenkins(jobs=args.jobs, builds=args.builds, fan_out=args.fan_out, tests=args.tests,
+                       failure_rate=args.failure_rate, payload=args.payload, latency=args.latency,
+                       error_rate=args.error_rate)
+
+    results = []
+    with fake, tempfile.TemporaryDirectory() as cache_dir:
+        options = ['--cache-dir', cache_dir] + args.options
+        for command in (['health', '--allow-failures', 'job-0'],
+                        ['summary', 'job-0', str(args.builds)],
+                        ['retry', 'job-0', str(args.builds)]):
+            _, measurements = run(fake, options, command)
+            results.append(measurements)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+
+    print('{0:<40} {1:>9} {2:>12} {3:>10} {4:>12}'.format('command', 'requests', 'bytes', 'time (s)', 'peak (MiB)'))
+    for r in results:
+        print('{0:<40} {1:>9} {2:>12} {3:>10.2f} {4:>12.1f}'.format(r['command'], r['requests'], r['bytes'],
+                                                                    r['wall_time'], r['peak_memory'] / 1024 ** 2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Times `matching.ArtifactIndex.similar`, as `summary` calls it for failed tests, against comparing every name (the
+previous implementation), and counts the names it compares exactly.
+
+Run with:
+
+    python benchmarks/bench_matching.py [--artifacts 5000] [--failures 200] [--similarity 0.3 0.6 0.9]
+"""
+import argparse
+import random
+import time
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from myjenkins import matching
+from myjenkins.matching import ArtifactIndex
+
+Artifact = namedtuple('Artifact', ['filename'])
+
+WORDS = ['Account', 'Booking', 'Cart', 'Checkout', 'Hotel', 'Login', 'Offer', 'Payment', 'Search', 'Voucher']
+
+
+def synthetic_name(rng):
+    """A test's name, e.g. ``testCheckoutWithVoucher17``."""
+    return 'test{0}With{1}{2}'.format(rng.choice(WORDS), rng.choice(WORDS), rng.randint(0, 99))
+
+
+def synthetic_artifacts(n, rng):
+    """Test reports, screenshots and logs, named after tests."""
+    return [Artifact('{0}{1}.{2}'.format(rng.choice(['', 'screenshot-', 'TEST-com.example.']), synthetic_name(rng),
+                                         rng.choice(['html', 'png', 'log', 'xml'])))
+            for _ in range(n)]
+
+
+def brute_force(artifacts, name, similarity, limit):
+    ratios = [(SequenceMatcher(a=name, b=a.filename, autojunk=False).ratio(), a) for a in artifacts]
+    return sorted([(r, a) for r, a in ratios if r > similarity], key=lambda r: (-r[0], r[1].filename))[:limit]
+
+
+def timed(f, names, *args):
+    start = time.perf_counter()
+    results = [f(name, *args) for name in names]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--artifacts', type=int, default=5000)
+    parser.add_argument('--failures', type=int, default=200)
+    parser.add_argument('--similarity', type=float, nargs='+', default=[0.3, 0.6, 0.9])
+    parser.add_argument('--max-artifacts', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    artifacts = synthetic_artifacts(args.artifacts, rng)
+    names = [synthetic_name(rng) for _ in range(args.failures)]
+    index = ArtifactIndex(artifacts)
+    compared = [0]
+
+    class CountingMatcher(SequenceMatcher):
+        def ratio(self):
+            compared[0] += 1
+            return super(CountingMatcher, self).ratio()
+
+    matching.SequenceMatcher = CountingMatcher
+
+    print('{0:>10} {1:>12} {2:>10} {3:>13}'.format('similarity', 'compare (s)', 'index (s)', 'compared (%)'))
+    for similarity in args.similarity:
+        expected, compare = timed(lambda *a: brute_force(artifacts, *a), names, similarity, args.max_artifacts)
+        compared[0] = 0
+        indexed, look_up = timed(index.similar, names, similarity, args.max_artifacts)
+        assert expected == indexed
+
+        print('{0:>10} {1:>12.2f} {2:>10.2f} {3:>13.1f}'.format(
+            similarity, compare, look_up, 100.0 * compared[0] / (len(names) * len(artifacts))))
+
+
+if __name__ == '__main__':
+    main()
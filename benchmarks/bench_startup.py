@@ -0,0 +1,61 @@
+"""Times starting the CLI: printing help, and failing on a bad argument, in fresh interpreters.
+
+Neither should touch Jenkins, so the hostname given is never connected to.
+
+Run with:
+
+    python benchmarks/bench_startup.py [--repeat 10]
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+HOST = 'http://jenkins.invalid'
+
+COMMANDS = [
+    ('--help', ['--help']),
+    ('health --help', ['-h', HOST, 'health', '--help']),
+    ('retry --help', ['-h', HOST, 'retry', '--help']),
+    ('summary (bad id)', ['-h', HOST, 'summary', 'job', 'nan']),
+]
+
+
+def run(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'myjenkins'] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def import_times(module):
+    """Return the cumulative import time (s) of ``module`` and of the heaviest packages it imports."""
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {0}'.format(module)],
+                         stderr=subprocess.PIPE, universal_newlines=True).stderr
+    times = {}
+    for match in re.finditer(r'^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$', err, re.MULTILINE):
+        cumulative, indent, name = match.groups()
+        if len(indent) <= 3: # The module itself and what it imports directly
+            times[name] = int(cumulative) / 1e6
+
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print('{0:<20} {1:>12} {2:>12}'.format('command', 'median (ms)', 'best (ms)'))
+    for name, command in COMMANDS:
+        times = [run(command) for _ in range(args.repeat)]
+        print('{0:<20} {1:>12.1f} {2:>12.1f}'.format(name, statistics.median(times) * 1000, min(times) * 1000))
+
+    print('\n{0:<20} {1:>12}'.format('import', 'time (ms)'))
+    for name, seconds in sorted(import_times('myjenkins.__main__').items(), key=lambda t: -t[1])[:8]:
+        print('{0:<20} {1:>12.1f}'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
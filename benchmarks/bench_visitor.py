@@ -0,0 +1,103 @@
+"""Times propagating `visitor.BranchState` down synthetic build trees against the previous deep-copying version.
+
+Run with:
+
+    python benchmarks/bench_visitor.py [--fan-out 10 10 10] [--repeat 5]
+"""
+import argparse
+import copy
+import time
+import tracemalloc
+from itertools import chain
+
+from myjenkins.picker import Branch, Revision
+from myjenkins.visitor import BranchState
+
+
+class SyntheticBuild(object):
+    """Just enough of a build for the pickers, with a build's worth of data."""
+
+    def __init__(self, name, leaf):
+        self.name = name
+        self.leaf = leaf
+        self._data = {
+            'fullDisplayName': name,
+            'actions': [{'parameters': [{'name': 'BRANCH_NAME', 'value': 'master'}]},
+                        {'causes': [{'shortDescription': 'Started by upstream project'}] * 20}],
+        }
+
+    def get_params(self):
+        return {'BRANCH_NAME': 'master'}
+
+    def get_revision(self):
+        return 'f00' if self.leaf else None # Only leaves check out the code
+
+
+def synthetic_tree(fan_out, children, name='root'):
+    """Return the root of a tree, adding each build's children to ``children``."""
+    build = SyntheticBuild(name, not fan_out)
+    children[build] = [synthetic_tree(fan_out[1:], children, '{0}.{1}'.format(name, i))
+                       for i in range(fan_out[0] if fan_out else 0)]
+
+    return build
+
+
+class LegacyBranchState(object):
+    """The previous implementation: deep-copies the state, and re-evaluates every picker, per node."""
+
+    def __init__(self, requirements=None, trackers=None, depth=-1):
+        self.depth = depth
+        self.requirements = requirements or []
+        self.trackers = trackers or []
+
+    def advance(self, next_build):
+        next_state = copy.deepcopy(self)
+        next_state.depth += 1
+
+        for p in chain(next_state.requirements, next_state.trackers):
+            p.evaluate(next_build)
+
+        return next_state
+
+
+def walk(build, state, children, states):
+    states.append(state)
+    for child in children[build]:
+        walk(child, state.advance(child), children, states)
+
+    return states
+
+
+def measure(cls, root, children, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        walk(root, cls([Branch('master')], [Branch(), Revision()]).advance(root), children, [])
+        best = min(best, time.perf_counter() - start)
+
+    # The states of every node are kept, as collected results refer to them
+    tracemalloc.start()
+    states = walk(root, cls([Branch('master')], [Branch(), Revision()]).advance(root), children, [])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return len(states), best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fan-out', type=int, nargs='+', default=[10, 10, 10])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    children = {}
+    root = synthetic_tree(args.fan_out, children)
+
+    print('{0:<10} {1:>6} {2:>10} {3:>11}'.format('state', 'nodes', 'time (ms)', 'peak (KiB)'))
+    for name, cls in [('legacy', LegacyBranchState), ('current', BranchState)]:
+        nodes, best, peak = measure(cls, root, children, args.repeat)
+        print('{0:<10} {1:>6} {2:>10.1f} {3:>11.1f}'.format(name, nodes, best * 1000, peak / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
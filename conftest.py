@@ -1,4 +1,8 @@
 import pytest
+from click.testing import CliRunner
+from myjenkins import fetch
+from myjenkins.__main__ import myjenkins
+from myjenkins.testing.fake_server import FakeJenkins
 from myjenkins.testing import jenkins_mocks
 from myjenkins.log import setup_logging
 
@@ -8,7 +12,15 @@ def pytest_configure():
 
 
 @pytest.fixture
-def client():
+def mock_fetch(monkeypatch):
+    """Fixture. Fetches builds of mock jobs with their own methods instead of tree queries."""
+    monkeypatch.setattr(fetch, 'get_build_metadata', lambda job, number, tree=None: job.get_build_metadata(number))
+    monkeypatch.setattr(fetch, 'iter_builds', lambda job: (job.get_build_metadata(k) for k in job.get_build_ids()))
+    monkeypatch.setattr(fetch, 'get_test_results', lambda build: list(build.get_resultset().values()))
+
+
+@pytest.fixture
+def client(mock_fetch):
     """Fixture. Returns a Jenkins client which exposes a job which has
     builds and subbuilds."""
     # create three jobs
@@ -43,3 +55,28 @@ def client():
     }
 
     return client
+
+
+@pytest.fixture
+def fake(request):
+    """Fixture. Returns a running fake Jenkins server with flaky tests.
+
+    Parametrise indirectly with a dict to pass other arguments to `FakeJenkins`."""
+    kwargs = dict(builds=6, fan_out=(2, ), tests=20, failure_rate=0.2)
+    kwargs.update(getattr(request, 'param', {}))
+
+    with FakeJenkins(**kwargs) as fake:
+        yield fake
+
+
+@pytest.fixture
+def invoke(fake, tmpdir):
+    """Fixture. Returns a function which runs the CLI with arguments against ``fake``, and returns its output."""
+    def invoke(*args):
+        result = CliRunner().invoke(myjenkins, ['--hostname', fake.url, '--cache-dir', str(tmpdir)] + list(args),
+                                    catch_exceptions=False)
+        assert result.exit_code == 0
+
+        return result.output
+
+    return invoke
@@ -31,6 +31,7 @@ let
     propagatedBuildInputs = [jenkinsapi] ++ (with pythonPackages; [
       click
       colorama
+      numpy
       termcolor
     ] ++ lib.optionals stdenv.isLinux [pandas]);
     buildInputs = [python] ++ (with pkgs; [
@@ -1,30 +1,78 @@
+import json
+import logging
+import os
+import sys
 import shutil
-from difflib import SequenceMatcher
-from collections import namedtuple
-from functools import wraps
-from termcolor import colored
+import time
 import click
-from jenkinsapi.jenkins import Jenkins
 from .validation import positive_nonzero
-from .actions import find_recent_builds, set_build_description
-from .util import TestStatus, test_status, ltrunc, subset
-from .runner import Runner
-from .output import output_frame
-from . import visitor, log
-
-
-def requires_pandas(f):
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        try:
-            import pandas as pd
-        except ImportError:
-            raise click.UsageError('pandas must be installed to run this command')
-
-        pd.set_option('display.max_colwidth', 140)
-        f(*args, **kwargs)
-
-    return wrapper
+from .util import format_dict, is_glob, ltrunc, subset
+from .defaults import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE, DEFAULT_DAEMON_PORT
+from .stats import STATS
+from . import log
+
+# Names of the runner classes in `myjenkins.runner`. Commands import what they
+# use (jenkinsapi, numpy...) themselves, so that --help and bad arguments are quick.
+ENGINES = {
+    'threads': 'Runner',
+    'async': 'AsyncRunner',
+}
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+
+class Obj(object):
+    """What commands share: a Jenkins client, a runner and a build cache, each made when first used."""
+
+    def __init__(self, hostname, username, token, engine, cache_dir, cache_size, no_cache, daemon, config):
+        self.hostname = hostname
+        self.username = username
+        self.token = token
+        self.engine = engine
+        self.cache_dir = None if no_cache else cache_dir
+        self.cache_size = cache_size
+        self.daemon = daemon
+        self.config = config
+        self._client = None
+        self._runner = None
+        self._cache = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from jenkinsapi.utils.crumb_requester import CrumbRequester
+            from .session import Client, configure_pool
+            from .stats import instrument
+
+            requester = instrument(CrumbRequester(self.username, self.token, baseurl=self.hostname))
+            self._client = Client(self.hostname, self.username, self.token, requester=requester,
+                                  lazy=True) # The root is polled only if needed
+            configure_pool(self._client, self.runner.concurrency)
+
+        return self._client
+
+    @property
+    def runner(self):
+        if self._runner is None:
+            self._runner = self.make_runner()
+
+        return self._runner
+
+    def make_runner(self, **overrides):
+        from . import runner
+        return getattr(runner, ENGINES[self.engine])(**dict(self.config, **overrides))
+
+    @property
+    def cache(self):
+        if self._cache is None and self.cache_dir is not None:
+            from .cache import BuildCache
+            self._cache = BuildCache.for_host(self.cache_dir, self.hostname, max_size=self.cache_size * 1024 ** 2)
+
+        return self._cache
+
+    def close(self):
+        if self._cache is not None:
+            self._cache.close() # Records which builds were read
 
 
 @click.group()
@@ -33,109 +81,329 @@ def requires_pandas(f):
 @click.option('-u', '--username', envvar='JENKINS_USERNAME')
 @click.option('-p', '--token', envvar='JENKINS_TOKEN')
 @click.option('-v', '--verbose', count=True)
-@click.option('-b', '--branch', help='restrict collection by branch')
-@click.option('-r', '--revision', help='restrict collection by revision')
+@click.option('-b', '--branch', help='restrict collection by branch; builds with another BRANCH_NAME are skipped '
+                                     'with their subbuilds, which are assumed to be passed the same BRANCH_NAME')
+@click.option('-r', '--revision', help='restrict collection by revision, as checked out by the builds collected')
 @click.option('-s', '--soft-limit', type=int, default=-1, help='end after this many matches')
 @click.option('-l', '--hard-limit', type=int, default=50, help='end after this many traversals')
-@click.option('-k', '--concurrency', type=int, default=-1, help='number of workers')
-def myjenkins(ctx, hostname, username, token, verbose, **config):
+@click.option('-k', '--concurrency', type=int, default=-1, help='number of workers (or requests in flight)')
+@click.option('-e', '--engine', type=click.Choice(sorted(ENGINES)), default='threads', show_default=True,
+              help='how to run traversals')
+@click.option('--cache-dir', envvar='MYJENKINS_CACHE_DIR', default=DEFAULT_CACHE_DIR, show_default=True,
+              help='where to cache finished builds')
+@click.option('--cache-size', type=int, default=DEFAULT_MAX_SIZE, show_default=True, help='cache size limit (MiB)')
+@click.option('--no-cache', is_flag=True, help='always fetch builds from Jenkins')
+@click.option('--daemon', envvar='MYJENKINS_DAEMON', metavar='HOST:PORT',
+              help='ask a `myjenkins serve` daemon, if it is up, rather than Jenkins')
+@click.option('--stats', is_flag=True, help='report API requests and timings on exit')
+@click.option('--stats-json', type=click.Path(dir_okay=False, writable=True),
+              help='write API request counts and timings to this file on exit')
+def myjenkins(ctx, hostname, username, token, verbose, engine, cache_dir, cache_size, no_cache, daemon, stats,
+              stats_json, **config):
     log.setup_logging(verbose)
+    STATS.reset()
+
+    if stats:
+        ctx.call_on_close(lambda: print(STATS.format(), file=sys.stderr))
+
+    if stats_json:
+        def dump():
+            with open(stats_json, 'w') as f:
+                json.dump(STATS.summary(), f, indent=2, sort_keys=True)
 
-    ctx.obj = namedtuple('obj', ['client', 'runner'])(Jenkins(hostname, username, token),
-                                                      Runner(**config))
+        ctx.call_on_close(dump)
+
+    ctx.obj = Obj(hostname, username, token, engine, cache_dir, cache_size, no_cache, daemon, config)
+    ctx.call_on_close(ctx.obj.close)
 
 
 @myjenkins.command()
 @click.pass_obj
 @click.argument('job')
-@click.argument('build_id', type=int)
+@click.argument('build_ids', metavar='[BUILD_ID]...', type=int, nargs=-1)
 @click.option('-m', '--max-attempts', type=int, default=3, callback=positive_nonzero,
               help='give up after this many attempts')
-def retry(o, job, build_id, max_attempts):
-    """Rerun failed tests for a build and its children."""
-    job = o.client[job]
-    cur = original = job[build_id]
-    attempt_n = 0
-
-    while True:
-        failures = set(r.className for r in visitor.FailedTestCollector(o.client).visit(cur))
-        if not failures or attempt_n >= max_attempts:
-            break
-
-        # Retry the failed tests
-        print('Retrying {0} (attempt {1} of {2}; {3} tests still failing)...'.format(original,
-                                                                                     attempt_n + 1,
-                                                                                     max_attempts,
-                                                                                     len(failures)))
-
-        queued = job.invoke(build_params={'TEST_WHITELIST': '\n'.join(failures)})
-        queued.block_until_building()
-        triggered = job[queued.get_build_number()] # FIXME queued.get_build() does not work with folders
-
-        set_build_description(o.client,
-                              triggered,
-                              'Retry of #{0}\'s failed tests'.format(cur.buildno))
-
-        print('Waiting for {0} ...'.format(triggered.baseurl))
-        triggered.block_until_complete()
-        triggered.poll()
-
-        # Retry those that failed again, again
-        cur = triggered
-        attempt_n += 1
-
-    if attempt_n == 0:
-        raise click.BadParameter('No tests have failed for that build', param_hint='build_id')
-    elif failures:
-        print('Failure: {0} test(s) are still failing after {1} attempts'.format(len(failures), attempt_n + 1))
+@click.option('-w', '--failed-within', type=float, metavar='HOURS',
+              help='also retry every build which failed in the last HOURS hours')
+@click.option('-j', '--also-job', 'also_jobs', multiple=True,
+              help='with --failed-within, also retry failed builds of this job')
+@click.option('--poll-interval', type=float, default=1.0, show_default=True,
+              help='shortest time between checks on a queued or overdue build (seconds)')
+@click.option('--poll-rate', type=float, default=2.0, show_default=True,
+              help='most checks a second, across all builds')
+def retry(o, job, build_ids, max_attempts, failed_within, also_jobs, poll_interval, poll_rate):
+    """Rerun failed tests for builds and their children, retrying many builds at once."""
+    if also_jobs and failed_within is None:
+        raise click.BadParameter('Only builds found with --failed-within are retried for other jobs',
+                                 param_hint='also_job')
+
+    from .actions import find_failed_builds
+    from .retry import RetryLoop, run_retries
+    from . import fetch, visitor
+
+    jobs = [o.client[name] for name in (job, ) + also_jobs]
+    targets = [(jobs[0], fetch.get_build_metadata(jobs[0], build_id)) for build_id in build_ids]
+
+    if failed_within is not None:
+        since = time.time() - failed_within * 3600
+        seen = set((j.name, build.buildno) for j, build in targets)
+        targets += [(j, build) for j in jobs for build in find_failed_builds(j, since)
+                    if (j.name, build.buildno) not in seen]
+
+    if not targets:
+        raise click.BadParameter('Give a build, or --failed-within to find failed builds', param_hint='build_ids')
+
+    def failed_classes(build):
+        return set(r.className for r in visitor.FailedTestCollector(o.client, cache=o.cache).visit(build))
+
+    loops = run_retries([RetryLoop(j, build, max_attempts) for j, build in targets], failed_classes,
+                        o.runner.concurrency, poll_interval, poll_rate)
+
+    if len(loops) == 1:
+        if loops[0].attempts == 0 and loops[0].error is None:
+            raise click.BadParameter('No tests have failed for that build', param_hint='build_id')
+
+        print(loops[0].report())
     else:
-        print('Success: all tests passed after {0} attempt(s)'.format(attempt_n + 1))
+        for loop in loops:
+            print('{0}: {1}'.format(loop.original, loop.report()))
+
+    errors = [loop for loop in loops if loop.error is not None]
+    if errors:
+        raise click.ClickException('Could not retry {0} build(s)'.format(len(errors)))
+
+
+def _ask_daemon(o, query, **params):
+    """Return the answer of the ``myjenkins serve`` daemon to a query, or None if there is none to ask."""
+    if o.daemon is None:
+        return None
+
+    from .daemon import ask
+    return ask(o.daemon, query, dict(params, hostname=o.hostname,
+                                     **subset(o.config, ['branch', 'revision', 'soft_limit', 'hard_limit'])))
+
+
+def _report(breakdown, n_tests, n_runs, n_builds, html=False, job=None):
+    from .output import output_frame
+
+    print('{0}Found {1} flaky tests (of {2} total tests) affecting {3} branches '
+          '(based on {4} test runs from {5} builds)'
+          .format('{0}: '.format(job) if job else '',
+                  breakdown.nunique('test'),
+                  n_tests,
+                  breakdown.nunique('branch'),
+                  n_runs,
+                  n_builds))
+
+    output_frame(breakdown, html)
 
 
 @myjenkins.command()
 @click.pass_obj
-@click.argument('job')
+@click.argument('jobs', metavar='[JOB]...', nargs=-1)
 @click.option('-m', '--min-builds', default=2, help='only mark as flaky if >= N builds seen')
 @click.option('-h', '--html', is_flag=True)
 @click.option('-g', '--group-by-test', is_flag=True)
 @click.option('-f', '--allow-failures', is_flag=True)
-@requires_pandas
-def health(o, job, **kwargs):
-    """Identify flaky tests."""
-    import pandas as pd
-    from .process import flaky_breakdown
-
-    builds = find_recent_builds(o.client[job], **subset(kwargs, ['allow_failures']))
-
-    def process(result):
-        test, branch, revision, timestamp = result
-        status = test_status(test)
-        return (test.identifier(),
-                str(branch or '?'),
-                str(revision or '?'),
-                int(status == TestStatus.SUCCESS),
-                int(status == TestStatus.FAILURE),
-                timestamp)
-
-    vi = visitor.ExtendedTestCollector(o.client)
-    results = list(map(process, o.runner.run(vi, builds)))
-
-    if not results:
+@click.option('-p', '--per-job', is_flag=True, help='report on each job separately')
+@click.option('-i', '--incremental', 'state_file', type=click.Path(dir_okay=False),
+              help='keep aggregates in this file and only visit builds newer than those already seen')
+@click.option('-d', '--dump', type=click.Path(dir_okay=False, writable=True),
+              help='also write the test runs collected to this file, to report on again with --from-file')
+@click.option('--from-file', type=click.Path(dir_okay=False, exists=True),
+              help='report on test runs written with --dump (of JOBs, if given) rather than from Jenkins')
+@click.option('--follow', is_flag=True, help='keep running, reporting tests whose flakiness changes as builds finish')
+@click.option('--interval', type=float, default=60.0, help='seconds between checks for new builds with --follow')
+@click.option('--stream', is_flag=True,
+              help='aggregate test runs as they are collected rather than keeping them, for long histories')
+def health(o, jobs, per_job, state_file, dump, from_file, follow, interval, stream, **kwargs):
+    """Identify flaky tests of jobs (or globs of them, e.g. 'mypipeline/*').
+
+    Subbuilds shared between jobs are visited once (unless reporting --per-job), and --hard-limit applies to each
+    job."""
+    if from_file and (state_file or dump or follow):
+        raise click.BadParameter('Test runs from a file cannot be kept incrementally, followed or written again',
+                                 param_hint='from_file')
+    elif not (jobs or from_file):
+        raise click.BadParameter('Give a job, or --from-file', param_hint='jobs')
+    elif (state_file or follow) and len(jobs) > 1:
+        raise click.BadParameter('Only one job can be reported on incrementally or followed', param_hint='jobs')
+    elif (state_file or follow) and (dump or per_job):
+        raise click.BadParameter('Test runs cannot be written or reported on per job incrementally or while following',
+                                 param_hint='dump' if dump else 'per_job')
+    elif stream and (from_file or dump or per_job or state_file or follow):
+        raise click.BadParameter('Streamed test runs cannot be written, reported on per job or incrementally',
+                                 param_hint='stream')
+
+    answer = None if state_file or dump or from_file or per_job or follow or len(jobs) > 1 or is_glob(jobs[0]) else \
+        _ask_daemon(o, 'health', job=jobs[0], **subset(kwargs, ['min_builds', 'group_by_test', 'allow_failures']))
+    if answer is not None:
+        if answer['breakdown'] is not None:
+            from .breakdown import Breakdown
+            _report(Breakdown.from_dict(answer['breakdown']), answer['tests'], answer['runs'], answer['builds'],
+                    **subset(kwargs, ['html']))
         return
 
-    frame = pd.DataFrame.from_records(results,
-                                      columns=('test', 'branch', 'revision', 'success', 'failure', 'timestamp'))
-    frame = flaky_breakdown(frame, **subset(kwargs, ['min_builds', 'group_by_test']))
+    from .columnar import TestRuns
 
-    print('Found {0} flaky tests (of {1} total tests) affecting {2} branches '
-          '(based on {3} test runs from {4} builds)'
-          .format(frame.index.get_level_values('test').nunique(),
-                  len(set(t[0] for t in results)),
-                  frame.index.get_level_values('branch').nunique(),
-                  len(results),
-                  vi.matches))
+    if from_file:
+        from fnmatch import fnmatchcase
 
-    output_frame(frame, **subset(kwargs, ['html']))
+        runs = TestRuns.load(from_file)
+        jobs = [j for j in runs.jobs if not jobs or any(fnmatchcase(j, pattern) for pattern in jobs)]
+        if len(jobs) < len(runs.jobs):
+            runs = runs.select(jobs)
+    else:
+        runs, jobs = _collect_health(o, jobs, state_file, follow, stream, per_job, **kwargs)
+        if state_file or follow or stream:
+            if follow:
+                _follow_health(o, jobs[0], runs, interval, state_file, **kwargs)
+            return # Reported incrementally
+
+        if dump:
+            runs.save(dump)
+
+    for job, job_runs in [(job, runs.select([job])) for job in jobs] if per_job else [(None, runs)]:
+        if not job_runs:
+            continue
+
+        breakdown = job_runs.breakdown(**subset(kwargs, ['min_builds', 'group_by_test']))
+        _report(breakdown, job_runs.tests, len(job_runs), sum(job_runs.builds.values()),
+                job=job, **subset(kwargs, ['html']))
+
+
+def _collect_health(o, jobs, state_file, follow=False, stream=False, per_job=False, **kwargs):
+    """Return test runs of jobs' recent builds, and the jobs' names.
+
+    Subbuilds shared between jobs are visited once, or once per job if reporting ``per_job``.
+
+    Reporting incrementally, to follow or streaming, aggregates of the runs are reported and returned in their
+    place."""
+    from heapq import merge
+    from itertools import chain
+    from .actions import find_jobs, find_recent_builds
+    from .columnar import TestRuns
+    from .report import test_run
+    from . import visitor
+
+    jobs = find_jobs(o.client, jobs)
+    listings = [o.runner.limit(find_recent_builds(o.client[job], kwargs['allow_failures'])) for job in jobs]
+    if state_file or follow:
+        if len(jobs) > 1:
+            raise click.BadParameter('Only one job can be reported on incrementally or followed, not {0}'
+                                     .format(', '.join(jobs)), param_hint='jobs')
+        return _incremental_health(o, jobs[0], state_file, **kwargs), jobs
+    elif stream:
+        # Runs are aggregated newest first, so the jobs' builds are interleaved by when they started
+        return _stream_health(o, merge(*listings, key=lambda b: b.get_timestamp(), reverse=True), **kwargs), jobs
+
+    builds = chain.from_iterable(listings)
+
+    vi = visitor.ExtendedTestCollector(o.client, cache=o.cache, dedupe=True, per_job=per_job)
+    runs = TestRuns()
+    for result in o.make_runner(hard_limit=-1).run(vi, vi.unvisited(builds)):
+        runs.append(*test_run(result))
+
+    runs.builds = vi.job_matches
+    return runs, jobs
+
+
+def _incremental_health(o, job, state_file, **kwargs):
+    """Report on a job's builds since those aggregated in ``state_file``, and those which were still running then.
+
+    Builds which finish after newer ones are merged as if they were the newest. The limits only apply to the first
+    run, so that every build since is visited."""
+    from .actions import find_new_builds
+    from .aggregate import FlakyAggregates
+    from .report import tree_test_runs
+    from . import visitor
+
+    filters = dict(subset(o.config, ['branch', 'revision']), allow_failures=kwargs['allow_failures'])
+    old = FlakyAggregates.load(state_file) if state_file and os.path.exists(state_file) else FlakyAggregates()
+    if old.filters is not None and old.filters != filters:
+        raise click.ClickException('{0} holds aggregates of builds chosen by {1}, not {2}'
+                                   .format(state_file, format_dict(old.filters), format_dict(filters)))
+
+    visited, running = [], set()
+
+    def visiting(builds):
+        for build in builds:
+            visited.append(build.buildno)
+            yield build
+
+    builds = find_new_builds(o.client[job], old.last_build, old.pending, kwargs['allow_failures'], running)
+    runner = o.runner if old.last_build is None else o.make_runner(hard_limit=-1, soft_limit=-1)
+    vi = visitor.TreeCollector(o.client, cache=o.cache, dedupe=True)
+    vi.visited.update((None, ref) for ref in old.subbuilds) # Shared with the trees already merged
+    aggregates = FlakyAggregates(filters=filters)
+    for _, _, runs in tree_test_runs(runner, vi, visiting(builds)):
+        aggregates.add_runs(runs)
+
+    logger.info('Merging {0} test runs from {1} new builds'.format(aggregates.runs, len(visited)))
+    aggregates.last_build = max(visited + list(running) + [old.last_build or 0]) or None
+    aggregates.builds, aggregates.pending = vi.matches, running
+    aggregates.subbuilds = set(ref for _, ref in vi.visited)
+    aggregates.merge(old)
+    if state_file:
+        aggregates.save(state_file)
+
+    breakdown = aggregates.breakdown(**subset(kwargs, ['min_builds', 'group_by_test']))
+    _report(breakdown, len(aggregates.tests), aggregates.runs, aggregates.builds, **subset(kwargs, ['html']))
+
+    return aggregates
+
+
+def _stream_health(o, builds, **kwargs):
+    """Report on test runs aggregated as each build tree finishes, with only their aggregates kept."""
+    import tempfile
+    from .aggregate import SpillingAggregates
+    from .report import tree_test_runs
+    from . import visitor
+
+    vi = visitor.TreeCollector(o.client, cache=o.cache, dedupe=True)
+    with tempfile.TemporaryDirectory(prefix='myjenkins-') as directory:
+        aggregates = SpillingAggregates(directory)
+        for _, _, runs in tree_test_runs(o.make_runner(hard_limit=-1), vi, vi.unvisited(builds)):
+            aggregates.add_runs(runs)
+
+        breakdown = aggregates.breakdown(**subset(kwargs, ['min_builds', 'group_by_test']))
+
+    _report(breakdown, len(aggregates.tests), aggregates.runs, vi.matches, **subset(kwargs, ['html']))
+    return aggregates
+
+
+def _follow_health(o, job, aggregates, interval, state_file, min_builds, allow_failures, **kwargs):
+    """Report tests whose flakiness changes as builds of a job finish, until interrupted."""
+    from .aggregate import SUCCESS, FAILURE, FLAKES
+    from .follow import Follower
+
+    def flakiness(group):
+        return '{0:.1f}%'.format(group[FLAKES] / (group[SUCCESS] + group[FAILURE]) * 200) if group else 'unseen'
+
+    follower = Follower(o.client, o.make_runner(hard_limit=-1, soft_limit=-1), o.cache, job, aggregates,
+                        allow_failures)
+    logger.warning('Following {0}, every {1}s'.format(job, interval))
+    try:
+        while True:
+            merged = follower.aggregates
+            try:
+                changes = follower.update()
+            except Exception:
+                logger.exception('Could not update {0}'.format(job))
+                changes = []
+
+            if state_file and follower.aggregates is not merged:
+                follower.aggregates.save(state_file)
+
+            for (test, branch, revision), old, new in changes:
+                if new[SUCCESS] + new[FAILURE] >= min_builds:
+                    print('{0}: {1} on {2} ({3}) is {4} flaky, was {5} ({6} flakes in {7} runs)'.format(
+                        job, test, branch, revision, flakiness(new), flakiness(old), new[FLAKES],
+                        new[SUCCESS] + new[FAILURE]), flush=True)
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
 
 
 @myjenkins.command()
@@ -146,29 +414,48 @@ def health(o, job, **kwargs):
 @click.option('-m', '--max-artifacts', type=int, default=2)
 def summary(o, job, build_id, similarity, max_artifacts):
     """Finds all failed tests and the URLs of any artifacts (i.e. test reports) whose names are similar."""
-    job = o.client[job]
-    build = job[build_id]
+    from termcolor import colored
 
-    failures = visitor.FailedTestCollector(o.client).visit(build)
-    artifacts = set(build.get_artifacts())
-
-    # Find artifacts with similar names to the failed tests (with brute-force)
-    for failure in failures:
-        related_artifacts = [(matcher, artifact) for matcher, artifact in
-                             ((SequenceMatcher(a=failure.name, b=artifact.filename, autojunk=False), artifact) for artifact in artifacts)
-                             if matcher.ratio() > similarity]
-        related_artifacts = sorted(related_artifacts, key=lambda r: r[0].ratio(), reverse=True)[:max_artifacts]
+    answer = _ask_daemon(o, 'summary', job=job, build_id=build_id, similarity=similarity,
+                         max_artifacts=max_artifacts)
+    if answer is not None:
+        failures = answer['failures']
+    else:
+        from .report import BuildSummary
+        # A build's own tree is summarised whatever --branch/--revision say
+        runner = o.make_runner(branch=None, revision=None)
+        failures = BuildSummary.collect(o.client, runner, o.cache, o.client[job], build_id) \
+            .failures(similarity, max_artifacts)
 
+    for identifier, stack_trace, urls in failures:
         term_width = shutil.get_terminal_size()[0]
-        header = '\n' + (' {} ').format(ltrunc(failure.identifier(), term_width - 10)).center(term_width, '=')
+        header = '\n' + (' {} ').format(ltrunc(identifier, term_width - 10)).center(term_width, '=')
 
         print(colored(header, 'white', attrs=['bold']))
-        print('Stacktrace:\n{0}'.format(failure.errorStackTrace))
+        print('Stacktrace:\n{0}'.format(stack_trace))
 
-        if related_artifacts:
+        if urls:
             print('Artifacts:')
-            for _, artifact in related_artifacts:
-                print(artifact.url)
+            for url in urls:
+                print(url)
+
+
+@myjenkins.command()
+@click.pass_obj
+@click.option('--bind', default='127.0.0.1', show_default=True, help='address to listen on')
+@click.option('--port', type=int, default=DEFAULT_DAEMON_PORT, show_default=True)
+@click.option('--refresh', type=float, default=5.0, show_default=True, metavar='MINUTES',
+              help='how often to look for new builds of the jobs asked about')
+def serve(o, bind, port, refresh):
+    """Answer health and summary queries from memory, refreshing in the background.
+
+    Point other runs at the daemon with --daemon (or MYJENKINS_DAEMON)."""
+    from .daemon import Daemon
+
+    # Soft limits are applied per query, to the builds visited
+    daemon = Daemon(o.client, o.make_runner(soft_limit=-1), o.make_runner(branch=None, revision=None), o.cache,
+                    o.hostname, o.config, refresh * 60)
+    daemon.serve((bind, port))
 
 
 main = myjenkins
@@ -1,30 +1,89 @@
 import logging
+from fnmatch import fnmatchcase
 
 from requests.exceptions import HTTPError
 from jenkinsapi.custom_exceptions import NotFound
+from .util import is_glob
+from . import fetch
 
 logger = logging.getLogger('myjenkins') # FIXME Should use __name__
 
 
+def find_jobs(client, patterns):
+    """Return the names of jobs matching any of ``patterns`` (names, or globs such as ``'mypipeline/*'``).
+
+    A glob's folder (everything before its last ``/``) must be named in full."""
+    names = []
+    for pattern in patterns:
+        if not is_glob(pattern):
+            names.append(pattern)
+            continue
+
+        folder, _, glob = pattern.rpartition('/')
+        if folder:
+            jobs = ['{0}/{1}'.format(folder, j['name']) for j in client[folder]._data.get('jobs') or []]
+        else:
+            jobs = list(client.keys())
+
+        matches = sorted(j for j in jobs if fnmatchcase(j.rpartition('/')[2], glob))
+        if not matches:
+            logger.warning('No jobs match {0}'.format(pattern))
+
+        names += matches
+
+    return sorted(set(names), key=names.index)
+
+
 def find_recent_builds(job, allow_failures=False):
     """Return a list of most recent builds for a job."""
-    builds = _find_recent_builds(job)
-    builds = filter(lambda b: not b.is_running(), builds)
-
     if not allow_failures:
         logger.info('Ignoring failed builds')
-        builds = filter(lambda b: b.get_status() in ['SUCCESS', 'UNSTABLE'],
-                        builds)
 
-    return builds
+    return filter(lambda b: reportable(b, allow_failures), _find_recent_builds(job))
+
+
+def find_new_builds(job, last_build=None, pending=(), allow_failures=False, running=None):
+    """Yield builds of a job newer than build number ``last_build``, or among ``pending``, to report on.
+
+    Those still running are skipped, and their numbers added to ``running``
+    so that they can be visited once they have finished."""
+    pending = set(pending)
+    for build in _find_recent_builds(job):
+        number = build.buildno
+        if last_build is not None and number <= last_build:
+            if not pending or number < min(pending):
+                return # Builds are newest first, so the rest have been seen
+            elif number not in pending:
+                continue
+
+        pending.discard(number)
+        if build.is_running():
+            if running is not None:
+                running.add(number)
+        elif reportable(build, allow_failures):
+            yield build
+
+
+def reportable(build, allow_failures=False):
+    """Whether a build has finished, and (unless ``allow_failures``) passed or only failed tests."""
+    return not build.is_running() and (allow_failures or build.get_status() in ['SUCCESS', 'UNSTABLE'])
+
+
+def find_failed_builds(job, since):
+    """Return the finished builds of a job, started since ``since`` (in seconds since the epoch), with failures."""
+    for build in _find_recent_builds(job):
+        if build.get_timestamp().timestamp() < since:
+            break
+
+        if not build.is_running() and build.get_status() in ['UNSTABLE', 'FAILURE']:
+            yield build
 
 
 def _find_recent_builds(job):
-    for _id in job.get_build_ids():
-        try:
-            yield job.get_build_metadata(_id)
-        except (NotFound, HTTPError):
-            pass # FIXME Random 500s from Jenkins
+    try:
+        yield from fetch.iter_builds(job)
+    except (NotFound, HTTPError) as e:
+        logger.warning('Stopped listing builds of {0}: {1}'.format(job.name, e)) # Even after retrying
 
 
 def set_build_description(jenkins, build, description):
@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import zlib
+
+import numpy as np
+
+from .breakdown import Breakdown
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+SUCCESS, FAILURE, FLAKES, NEWEST, OLDEST = list(range(5))
+
+MAX_GROUPS = 250000 # Held in memory by `SpillingAggregates`; each takes a few hundred bytes
+PARTITIONS = 16
+
+
+class FlakyAggregates(object):
+    """Running per-(test, branch, revision) aggregates of test runs.
+
+    Each group keeps its success and failure counts, how often it went from
+    failing to passing (its flakes) and whether its newest and oldest runs
+    failed. That is enough to merge in runs newer or older than those already
+    seen without keeping the runs themselves.
+
+    ``last_build`` is the newest build seen, and ``pending`` the numbers of
+    those which were still running, to visit once they have finished.
+    ``filters`` are the options the builds were chosen by (e.g. their branch),
+    which later runs must share to be merged in. ``subbuilds`` are the
+    ``(job name, build number)`` of the subbuilds visited, so that newer trees
+    sharing them do not count them again."""
+
+    def __init__(self, groups=None, last_build=None, builds=0, pending=(), filters=None, subbuilds=()):
+        self.groups = groups or {}
+        self.last_build = last_build
+        self.builds = builds
+        self.pending = set(pending)
+        self.filters = filters
+        self.subbuilds = set(subbuilds)
+
+    @classmethod
+    def of(cls, runs, **kwargs):
+        """Aggregate `report.test_run` rows, in any order."""
+        aggregates = cls(**kwargs)
+        aggregates.add_runs(runs)
+
+        return aggregates
+
+    def add_runs(self, runs):
+        """Add `report.test_run` rows, in any order, but all older than the runs already added."""
+        for run in sorted(runs, key=lambda r: r[5], reverse=True):
+            test, branch, revision, success, failure = run[:5]
+            self.add((test, branch, revision), success, failure)
+
+    def add(self, key, success, failure):
+        """Add a test run. Runs must be added newest first."""
+        group = self.groups.get(key)
+        if group is None:
+            self.groups[key] = [success, failure, 0, failure, failure]
+            return
+
+        group[SUCCESS] += success
+        group[FAILURE] += failure
+        group[FLAKES] += int(failure and not group[OLDEST])
+        group[OLDEST] = failure
+
+    def merge(self, older):
+        """Merge in aggregates of runs which are all older than those in this one."""
+        for key, other in older.groups.items():
+            group = self.groups.get(key)
+            if group is None:
+                self.groups[key] = list(other)
+                continue
+
+            group[SUCCESS] += other[SUCCESS]
+            group[FAILURE] += other[FAILURE]
+            group[FLAKES] += other[FLAKES] + int(other[NEWEST] and not group[OLDEST])
+            group[OLDEST] = other[OLDEST]
+
+        self.builds += older.builds
+        self.subbuilds |= older.subbuilds
+        if self.last_build is None:
+            self.last_build = older.last_build
+        if self.filters is None:
+            self.filters = older.filters
+
+    @property
+    def runs(self):
+        return sum(g[SUCCESS] + g[FAILURE] for g in self.groups.values())
+
+    @property
+    def tests(self):
+        return set(test for test, _, _ in self.groups)
+
+    def flaky(self, min_builds=2):
+        """Yield ``(key, group)`` for each group seen at least ``min_builds`` times, with flakes."""
+        return ((key, group) for key, group in self.groups.items()
+                if group[SUCCESS] + group[FAILURE] >= min_builds and group[FLAKES] > 0)
+
+    def breakdown(self, min_builds=2, group_by_test=False):
+        """As `columnar.TestRuns.breakdown`, but from the aggregates."""
+        return _breakdown(self.flaky(min_builds), group_by_test)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+
+        return cls(dict((tuple(g[:3]), g[3:]) for g in data['groups']), data['last_build'], data['builds'],
+                   data.get('pending', ()), data.get('filters'), map(tuple, data.get('subbuilds', ())))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            f.write(json.dumps({ # json.dump encodes piece by piece, several times slower
+                'last_build': self.last_build,
+                'builds': self.builds,
+                'pending': sorted(self.pending),
+                'filters': self.filters,
+                'subbuilds': sorted(self.subbuilds),
+                'groups': [list(key) + group for key, group in self.groups.items()],
+            }))
+
+
+class SpillingAggregates(object):
+    """As `FlakyAggregates`, but written to disk a part at a time once there are many groups.
+
+    Once more than ``max_groups`` groups are held they are saved in
+    ``directory``, partitioned by test, and aggregating starts afresh for the
+    (older) runs to come. Each partition's parts are merged in turn to report,
+    so only the groups of one partition, and the names of the tests, are held
+    at once."""
+
+    def __init__(self, directory, max_groups=MAX_GROUPS, partitions=PARTITIONS):
+        self.directory = directory
+        self.max_groups = max_groups
+        self.partitions = partitions
+        self.current = FlakyAggregates()
+        self.spilled = 0
+        self.runs = 0
+        self.tests = set()
+
+    def add_runs(self, runs):
+        """As `FlakyAggregates.add_runs`."""
+        runs = list(runs)
+        self.current.add_runs(runs)
+        self.runs += len(runs)
+        self.tests.update(run[0] for run in runs)
+
+        if len(self.current.groups) > self.max_groups:
+            self._spill()
+
+    def _spill(self):
+        parts = [FlakyAggregates() for _ in range(self.partitions)]
+        for key, group in self.current.groups.items():
+            parts[self._partition(key)].groups[key] = group
+
+        for i, part in enumerate(parts):
+            part.save(self._path(i, self.spilled))
+
+        logger.info('Spilled {0} groups to {1}'.format(len(self.current.groups), self.directory))
+        self.current = FlakyAggregates()
+        self.spilled += 1
+
+    def _partition(self, key):
+        return zlib.crc32(key[0].encode('utf-8')) % self.partitions
+
+    def _path(self, partition, spill):
+        return os.path.join(self.directory, 'part-{0}-{1}.json'.format(partition, spill))
+
+    def merged(self):
+        """Yield `FlakyAggregates` of all the runs added, a partition (of the tests) at a time."""
+        if not self.spilled:
+            yield self.current
+            return
+
+        for i in range(self.partitions):
+            merged = FlakyAggregates.load(self._path(i, 0))
+            for spill in range(1, self.spilled):
+                merged.merge(FlakyAggregates.load(self._path(i, spill)))
+
+            merged.merge(FlakyAggregates(dict((key, group) for key, group in self.current.groups.items()
+                                              if self._partition(key) == i)))
+            yield merged
+
+    def breakdown(self, min_builds=2, group_by_test=False):
+        """As `FlakyAggregates.breakdown`."""
+        return _breakdown([row for part in self.merged() for row in part.flaky(min_builds)], group_by_test)
+
+
+def _breakdown(rows, group_by_test):
+    names = ['test', 'branch', 'revision'] if group_by_test else ['branch', 'revision', 'test']
+    rows = sorted((key if group_by_test else key[1:] + key[:1], group) for key, group in rows)
+
+    groups = np.array([group for _, group in rows], dtype=np.int64).reshape(-1, 5)
+    return Breakdown(names, [key for key, _ in rows], groups[:, SUCCESS], groups[:, FAILURE], groups[:, FLAKES])
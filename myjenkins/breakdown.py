@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from html import escape
+
+import numpy as np
+
+COLUMNS = [('success', 'n'), ('failure', 'n'), ('total', ''), ('flakiness %', '')]
+
+
+class Breakdown(object):
+    """A breakdown of flaky tests, laid out as the pandas frame of `tests/reference.py`.
+
+    Renders with pandas if it is installed, and as a plain table if not."""
+
+    def __init__(self, names, index, success, failure, flakes):
+        self.names = names
+        self.index = index
+        self.flakes = flakes
+        self.total = success + failure
+        self.columns = OrderedDict(zip(COLUMNS, [
+            success,
+            failure,
+            self.total,
+            np.round(flakes / self.total * 200, decimals=1),
+        ]))
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def empty(self):
+        return not self.index
+
+    def nunique(self, name):
+        level = self.names.index(name)
+        return len(set(key[level] for key in self.index))
+
+    def to_dict(self):
+        """Return the breakdown as JSON-serialisable data, from which `from_dict` makes it again."""
+        return {
+            'names': self.names,
+            'index': [list(key) for key in self.index],
+            'success': self.columns[COLUMNS[0]].tolist(),
+            'failure': self.columns[COLUMNS[1]].tolist(),
+            'flakes': self.flakes.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['names'], [tuple(key) for key in data['index']],
+                   *[np.array(data[k], dtype=np.int64) for k in ('success', 'failure', 'flakes')])
+
+    def to_frame(self):
+        import pandas as pd
+
+        index = pd.MultiIndex.from_tuples(self.index, names=self.names) if self.index else None
+        return pd.DataFrame(self.columns, index=index)
+
+    def to_string(self):
+        try:
+            import pandas as pd
+        except ImportError:
+            return '\n'.join('  '.join(row).rstrip() for row in _align(self._rows()))
+
+        with pd.option_context('display.max_colwidth', 140):
+            return self.to_frame().to_string()
+
+    def to_html(self):
+        try:
+            import pandas as pd
+        except ImportError:
+            rows = self._rows()
+            return '<table>\n{0}\n</table>'.format('\n'.join(
+                '<tr>{0}</tr>'.format(''.join('<td>{0}</td>'.format(escape(cell)) for cell in row))
+                for row in rows))
+
+        with pd.option_context('display.max_colwidth', 140):
+            return self.to_frame().to_html()
+
+    def _rows(self):
+        header = self.names + [' '.join(filter(None, c)) for c in COLUMNS]
+        return [header] + [list(key) + [str(c[i]) for c in self.columns.values()]
+                           for i, key in enumerate(self.index)]
+
+
+def _align(rows):
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return [[cell.ljust(width) for cell, width in zip(row, widths)] for row in rows]
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from . import fetch
+from .defaults import DEFAULT_MAX_SIZE
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+
+class BuildCache(object):
+    """Stores data of finished builds, which Jenkins never changes, in SQLite.
+
+    Entries are keyed by job name, build number and kind (e.g. ``'build'`` or
+    ``'resultset'``). Once the total size exceeds ``max_size`` bytes the least
+    recently used entries are evicted, down to ``EVICT_TO`` of it.
+
+    The total size is kept from when the cache is opened, and reads are only
+    recorded with the next write, every ``FLUSH_READS`` reads, or on `close`."""
+
+    EVICT_TO = 0.9
+    EVICT_BATCH = 500
+    FLUSH_READS = 1000
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE * 1024 ** 2):
+        self.path = path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS entries ('
+                        'job TEXT, number INTEGER, kind TEXT, data BLOB, size INTEGER, accessed REAL, '
+                        'PRIMARY KEY (job, number, kind))')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self.db.commit()
+        self.total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        self.reads = {} # (job, number, kind) -> when last read, yet to be recorded
+
+    @classmethod
+    def for_host(cls, cache_dir, hostname, **kwargs):
+        """Open the cache for a Jenkins server inside ``cache_dir``."""
+        os.makedirs(cache_dir, exist_ok=True)
+        name = re.sub(r'[^\w.-]+', '_', hostname).strip('_')
+
+        return cls(os.path.join(cache_dir, '{0}.sqlite'.format(name)), **kwargs)
+
+    def get(self, job_name, number, kind):
+        with self.lock:
+            row = self.db.execute('SELECT data FROM entries WHERE job = ? AND number = ? AND kind = ?',
+                                  (job_name, number, kind)).fetchone()
+            if row is None:
+                return None
+
+            self.reads[(job_name, number, kind)] = time.time()
+            if len(self.reads) >= self.FLUSH_READS:
+                self._record_reads()
+                self.db.commit()
+
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def put(self, job_name, number, kind, data):
+        blob = zlib.compress(json.dumps(data).encode('utf-8'))
+
+        with self.lock:
+            old = self.db.execute('SELECT size FROM entries WHERE job = ? AND number = ? AND kind = ?',
+                                  (job_name, number, kind)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                            (job_name, number, kind, blob, len(blob), time.time()))
+            self.total += len(blob) - (old[0] if old else 0)
+            self._record_reads()
+            if self.total > self.max_size:
+                self._evict()
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self._record_reads()
+            self.db.commit()
+            self.db.close()
+
+    @property
+    def size(self):
+        with self.lock:
+            return self.total
+
+    def _record_reads(self):
+        self.db.executemany('UPDATE entries SET accessed = ? WHERE job = ? AND number = ? AND kind = ?',
+                            [(accessed, ) + key for key, accessed in self.reads.items()])
+        self.reads.clear()
+
+    def _evict(self):
+        evicted = 0
+        while self.total > self.max_size * self.EVICT_TO:
+            rows = self.db.execute('SELECT job, number, kind, size FROM entries ORDER BY accessed LIMIT ?',
+                                   (self.EVICT_BATCH, )).fetchall()
+            if not rows:
+                self.total = 0 # Others sharing the file have evicted them
+                break
+
+            batch = []
+            for job, number, kind, size in rows:
+                if self.total <= self.max_size * self.EVICT_TO:
+                    break
+                batch.append((job, number, kind))
+                self.total -= size
+
+            self.db.executemany('DELETE FROM entries WHERE job = ? AND number = ? AND kind = ?', batch)
+            evicted += len(batch)
+
+        logger.debug('Evicted {0} cache entries'.format(evicted))
+
+
+class CachedBuild(fetch.PrunedBuild):
+    """A finished build restored from the cache."""
+
+    def is_running(self):
+        return False
+
+
+def get_build(cache, job, number, kind='build'):
+    """Return a build's metadata, consulting the cache first. ``kind`` is one of `fetch.TREES`."""
+    if cache is not None:
+        data = cache.get(job.name, number, kind)
+        if data is not None:
+            return CachedBuild(job, number, data)
+
+    build = fetch.get_build_metadata(job, number, fetch.TREES[kind])
+
+    if cache is not None and not build.is_running():
+        cache.put(job.name, number, kind, build._data)
+
+    return build
+
+
+def get_results(cache, build):
+    """Return a build's test results, consulting the cache first."""
+    if cache is not None:
+        data = cache.get(build.job.name, build.buildno, 'resultset')
+        if data is not None:
+            return fetch.results_from(build, data)
+
+    results = fetch.get_test_results(build)
+
+    if cache is not None and not build.is_running():
+        cache.put(build.job.name, build.buildno, 'resultset',
+                  [dict((f, getattr(r, f, None)) for f in fetch.RESULT_FIELDS) for r in results])
+
+    return results
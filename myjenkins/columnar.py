@@ -0,0 +1,225 @@
+import struct
+import zipfile
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from .breakdown import Breakdown
+
+KEYS = ('test', 'branch', 'revision')
+STRING_COLUMNS = KEYS + ('job', )
+
+
+class StringTable(object):
+    """Interns strings as integer codes."""
+
+    def __init__(self, strings=()):
+        self.strings = []
+        self.codes = {}
+
+        for s in strings:
+            self.code(s)
+
+    def __len__(self):
+        return len(self.strings)
+
+    def code(self, s):
+        code = self.codes.get(s)
+        if code is None:
+            code = self.codes[s] = len(self.strings)
+            self.strings.append(s)
+
+        return code
+
+    def ranks(self):
+        """Return each code's position in sorted order, and the codes in sorted order."""
+        order = np.argsort(np.array(self.strings, dtype=object), kind='stable')
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+
+        return ranks, order
+
+
+class TestRuns(object):
+    """Test runs stored as compact columns, with strings interned as integer codes.
+
+    A run takes 29 bytes (plus its strings, once), so long histories fit in
+    memory without pandas or the `Test` objects they came from. Each run also
+    records the job and number of the root build it came from, and ``builds``
+    counts the builds collected per job.
+
+    Runs can be saved to an uncompressed ``.npz`` file, and loaded from one
+    with each column memory-mapped rather than read in. Runs may also share
+    their string tables with others, to be put together (see `concatenate`)."""
+
+    def __init__(self, tables=None):
+        self.tables = tables if tables is not None else dict((key, StringTable()) for key in STRING_COLUMNS)
+        self.codes = dict((key, array('i')) for key in STRING_COLUMNS)
+        self.failure = array('b')
+        self.timestamp = array('d')
+        self.build = array('i')
+        self.builds = Counter()
+
+    def __len__(self):
+        return len(self.failure)
+
+    def append(self, test, branch, revision, success, failure, timestamp, job='', build=0):
+        """Add a test run. A run either succeeds or fails, so only ``failure`` is kept."""
+        for key, value in zip(STRING_COLUMNS, (test, branch, revision, job)):
+            self.codes[key].append(self.tables[key].code(value))
+
+        self.failure.append(failure)
+        self.timestamp.append(timestamp)
+        self.build.append(build)
+
+    @property
+    def tests(self):
+        return len(self.tables['test'])
+
+    @property
+    def jobs(self):
+        return list(self.tables['job'].strings)
+
+    def select(self, jobs):
+        """Return the runs of some jobs only."""
+        table = self.tables['job']
+        mask = np.isin(np.asarray(self.codes['job']), [table.codes[j] for j in jobs if j in table.codes])
+        selected = TestRuns()
+
+        for key in STRING_COLUMNS:
+            used, codes = np.unique(np.asarray(self.codes[key])[mask], return_inverse=True)
+            selected.tables[key] = StringTable(self.tables[key].strings[c] for c in used)
+            selected.codes[key] = codes.astype(np.int32)
+
+        selected.failure = np.asarray(self.failure)[mask]
+        selected.timestamp = np.asarray(self.timestamp)[mask]
+        selected.build = np.asarray(self.build)[mask]
+        selected.builds = Counter(dict((j, n) for j, n in self.builds.items() if j in jobs))
+
+        return selected
+
+    @classmethod
+    def concatenate(cls, parts):
+        """Return the runs of ``parts``, which share their string tables, together (with tables of their own)."""
+        runs = cls()
+        if not parts:
+            return runs
+
+        for key in STRING_COLUMNS:
+            used, codes = np.unique(np.concatenate([np.asarray(p.codes[key], dtype=np.int32) for p in parts]),
+                                    return_inverse=True)
+            runs.tables[key] = StringTable(parts[0].tables[key].strings[c] for c in used)
+            runs.codes[key] = codes.astype(np.int32)
+
+        runs.failure = np.concatenate([np.asarray(p.failure, dtype=np.int8) for p in parts])
+        runs.timestamp = np.concatenate([np.asarray(p.timestamp, dtype=np.float64) for p in parts])
+        runs.build = np.concatenate([np.asarray(p.build, dtype=np.int32) for p in parts])
+        runs.builds = sum((p.builds for p in parts), Counter())
+
+        return runs
+
+    def save(self, f):
+        """Write the runs to a file (or path, as is) in NumPy's ``.npz`` format, uncompressed so `load` can map it."""
+        for job in self.builds:
+            self.tables['job'].code(job) # So that jobs with builds but no runs are kept
+
+        columns = {
+            'failure': np.asarray(self.failure, dtype=np.int8),
+            'timestamp': np.asarray(self.timestamp, dtype=np.float64),
+            'build': np.asarray(self.build, dtype=np.int32),
+            'builds': np.array([self.builds[j] for j in self.tables['job'].strings], dtype=np.int64),
+        }
+
+        for key in STRING_COLUMNS:
+            encoded = [s.encode('utf-8') for s in self.tables[key].strings]
+            columns[key] = np.asarray(self.codes[key], dtype=np.int32)
+            columns[key + '_strings'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            columns[key + '_offsets'] = np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64)
+
+        if not hasattr(f, 'write'):
+            with open(f, 'wb') as handle: # np.savez would add .npz to the path
+                np.savez(handle, **columns)
+        else:
+            np.savez(f, **columns)
+
+    @classmethod
+    def load(cls, path):
+        """Read runs written by `save`. Their columns are memory-mapped, so runs loaded can't be added to."""
+        columns = _map_npz(path)
+        runs = cls()
+
+        for key in STRING_COLUMNS:
+            strings, offsets = columns[key + '_strings'].tobytes(), columns[key + '_offsets']
+            runs.tables[key] = StringTable(strings[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:]))
+            runs.codes[key] = columns[key]
+
+        runs.failure = columns['failure']
+        runs.timestamp = columns['timestamp']
+        runs.build = columns['build']
+        runs.builds = Counter(dict((j, int(n)) for j, n in zip(runs.tables['job'].strings, columns['builds']) if n))
+
+        return runs
+
+    def breakdown(self, min_builds=2, group_by_test=False):
+        """As the pandas reference breakdown (see `tests/reference.py`), computed with NumPy alone."""
+        names = ['test', 'branch', 'revision'] if group_by_test else ['branch', 'revision', 'test']
+        ranks = dict((name, self.tables[name].ranks()) for name in names)
+
+        # Sort by group, then newest first (stable, as with pandas); group keys are ranks so
+        # that groups come out in the same order as from groupby
+        keys = [ranks[name][0][np.array(self.codes[name], dtype=np.int64)] for name in names]
+        order = np.lexsort([-np.array(self.timestamp)] + keys[::-1])
+        keys = [key[order] for key in keys]
+        failure = np.array(self.failure, dtype=np.int64)[order]
+
+        starts = np.zeros(len(failure), dtype=bool)
+        starts[:1] = True
+        for key in keys:
+            starts[1:] |= key[1:] != key[:-1]
+
+        codes = np.cumsum(starts) - 1
+        n = codes[-1] + 1 if len(codes) else 0
+
+        # A failure following a success (newest first) is the test going from failing to passing
+        flaked = (failure[1:] > failure[:-1]) & ~starts[1:]
+
+        runs = np.bincount(codes, minlength=n)
+        failures = np.bincount(codes, weights=failure, minlength=n).astype(np.int64)
+        flakes = np.bincount(codes[1:][flaked], minlength=n)
+
+        keep = (runs >= min_builds) & (flakes > 0)
+        first = np.flatnonzero(starts)[keep]
+        index = list(zip(*[[self.tables[name].strings[c] for c in ranks[name][1][key[first]]]
+                           for name, key in zip(names, keys)]))
+
+        return Breakdown(names, index, runs[keep] - failures[keep], failures[keep], flakes[keep])
+
+
+def _map_npz(path):
+    """Memory-map each array of an uncompressed ``.npz`` file, by name."""
+    arrays = {}
+
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('{0} is compressed, so cannot be mapped'.format(info.filename))
+
+            # The data follows the member's local header, then the array's .npy header
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else \
+                np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+
+            name = info.filename[:-len('.npy')]
+            if not int(np.prod(shape)):
+                arrays[name] = np.empty(shape, dtype=dtype) # Nothing to map
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+
+    return arrays
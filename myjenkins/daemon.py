@@ -0,0 +1,320 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urlencode, urlsplit
+from urllib.request import urlopen
+
+from .actions import find_recent_builds
+from .columnar import TestRuns
+from .report import BuildSummary, tree_test_runs
+from .util import subset
+from .visitor import TreeCollector
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+# The arguments of each query, besides the settings the daemon must share with whoever asks
+QUERIES = {
+    'health': ('job', 'allow_failures', 'min_builds', 'group_by_test', 'soft_limit'),
+    'summary': ('job', 'build_id', 'similarity', 'max_artifacts'),
+}
+SETTINGS = ('hostname', 'branch', 'revision', 'hard_limit')
+
+MAX_SUMMARIES = 100
+ASK_TIMEOUT = 600.0 # The first query about a job visits all of its recent builds
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    """Handles each request on its own thread (as `http.server.ThreadingHTTPServer`, new in Python 3.7, does)."""
+
+    daemon_threads = True
+
+
+class _Visits(object):
+    """Which subbuilds each kept tree of a job visited, and which it came across, so that refreshes count those
+    shared between trees once.
+
+    As `health` visits newer builds first, a subbuild shared between trees is
+    counted in the newest of them. Once that tree is forgotten, those sharing
+    its subbuilds must be visited again to count them."""
+
+    def __init__(self):
+        self.claimed = {} # Root build number -> references its tree visited
+        self.referred = {} # Root build number -> references its tree came across
+
+    def visited(self, numbers):
+        """Return what the trees of roots visited, as `visitor.BuildVisitor.visited`."""
+        return set((None, ref) for number in numbers for ref in self.claimed.get(number, ()))
+
+    def drop(self, numbers):
+        for number in numbers:
+            self.claimed.pop(number, None)
+            self.referred.pop(number, None)
+
+    def forget(self, numbers):
+        """Forget the trees of roots. Returns the numbers of others which shared their subbuilds, forgotten too."""
+        numbers, again = list(numbers), []
+        while numbers:
+            released = set(ref for number in numbers for ref in self.claimed.get(number, ()))
+            self.drop(numbers)
+            numbers = [number for number, refs in self.referred.items() if not refs.isdisjoint(released)]
+            again += numbers
+
+        return again
+
+    def overlapping(self, order):
+        """Return the numbers of roots whose trees visited a subbuild which a tree before them in ``order`` did."""
+        first, later = {}, set()
+        for number in sorted(self.claimed, key=order.index):
+            for ref in self.claimed[number]:
+                if first.setdefault(ref, number) != number:
+                    later.add(number)
+
+        return [number for number in order if number in later]
+
+
+class _Collector(TreeCollector):
+    """As `TreeCollector`, but noting in `_Visits` which subbuilds each tree visits, and comes across."""
+
+    def __init__(self, client, cache, visits, visited):
+        super(_Collector, self).__init__(client, cache=cache, dedupe=True)
+        self.visits = visits
+        self.visited = visited
+
+    def child_refs(self, build, state):
+        refs = super(_Collector, self).child_refs(build, state)
+        with self.lock:
+            self.visits.claimed.setdefault(state.root.buildno, set()).update(refs)
+            self.visits.referred.setdefault(state.root.buildno, set()).update(
+                (sb['jobName'], sb['buildNumber']) for sb in build._data.get('subBuilds', []))
+
+        return refs
+
+
+class Daemon(object):
+    """Answers `health` and `summary` queries over HTTP from what it keeps in memory.
+
+    For health, the test runs of each build tree of a job's recent builds are
+    kept, as columns, and new builds are visited every ``refresh`` seconds
+    once a job has been asked about. Answers are kept until then. Summaries
+    of finished builds never change, so the most recent asked for are kept as
+    they are. Answers are the data the commands print (see `ask`), so they
+    come out the same either way."""
+
+    def __init__(self, client, runner, summary_runner, cache, hostname, config, refresh=300.0):
+        self.client = client
+        self.runner = runner
+        self.summary_runner = summary_runner # Without --branch/--revision, which only filter health's trees
+        self.cache = cache
+        self.settings = dict(subset(config, SETTINGS), hostname=hostname)
+        self.refresh = refresh
+        self.lock = threading.Lock() # Visits share the runner, so are made one at a time
+        self.trees = {} # (job, allow_failures) -> [(build number, TestRuns)], newest first
+        self.tables = {} # (job, allow_failures) -> string tables shared by its trees' runs
+        self.visits = {} # (job, allow_failures) -> _Visits of its trees
+        self.answers = {} # (job, allow_failures, min_builds, group_by_test, soft_limit) -> health answer
+        self.answers_lock = threading.Lock()
+        self.summaries = OrderedDict() # (job, build number) -> BuildSummary
+        self.summaries_lock = threading.Lock() # Handlers run on their own threads
+        self.stopping = threading.Event()
+        self.server = None
+
+    # Queries
+
+    def health(self, job, allow_failures, min_builds, group_by_test, soft_limit):
+        key = (job, allow_failures)
+        if key not in self.trees:
+            self.update(key)
+
+        trees = self.trees[key]
+        with self.answers_lock:
+            answer = self.answers.get(key + (min_builds, group_by_test, soft_limit))
+        if answer is not None:
+            return answer
+
+        parts, matches = [], 0
+        for _, tree in trees:
+            if 0 < soft_limit <= matches:
+                break # As a runner would stop starting trees
+
+            matches += sum(tree.builds.values())
+            parts.append(tree)
+
+        runs = TestRuns.concatenate(parts)
+        answer = {'breakdown': None} if not runs else {
+            'breakdown': runs.breakdown(min_builds, group_by_test).to_dict(),
+            'tests': runs.tests,
+            'runs': len(runs),
+            'builds': matches,
+        }
+
+        with self.answers_lock:
+            if self.trees[key] is trees: # Not updated meanwhile
+                self.answers[key + (min_builds, group_by_test, soft_limit)] = answer
+
+        return answer
+
+    def summary(self, job, build_id, similarity, max_artifacts):
+        key = (job, build_id)
+        with self.summaries_lock:
+            summary = self.summaries.get(key)
+            if summary is not None:
+                self.summaries.move_to_end(key)
+
+        if summary is None:
+            with self.lock:
+                summary = BuildSummary.collect(self.client, self.summary_runner, self.cache, self.client[job], build_id)
+
+            if not any(b.is_running() for b, _ in summary.builds):
+                with self.summaries_lock:
+                    self.summaries[key] = summary
+                    while len(self.summaries) > MAX_SUMMARIES:
+                        self.summaries.popitem(last=False)
+
+        return {'failures': list(summary.failures(similarity, max_artifacts))}
+
+    def update(self, key):
+        """Visit a job's recent builds which have not been visited, and forget those no longer recent."""
+        job, allow_failures = key
+
+        with self.lock:
+            trees = dict((tree[0], tree) for tree in self.trees.get(key, []))
+            builds = list(self.runner.limit(find_recent_builds(self.client[job], allow_failures)))
+            order = [b.buildno for b in builds]
+            visits = self.visits.setdefault(key, _Visits())
+
+            # Subbuilds only counted in trees no longer recent are counted in others sharing them
+            old = [number for number in set(trees) | set(visits.claimed) if number not in order]
+            for number in old + visits.forget(old):
+                trees.pop(number, None)
+
+            new = [b for b in builds if b.buildno not in trees]
+            visits.drop(b.buildno for b in new) # If visiting them failed before
+            if new:
+                # Then newer trees count the subbuilds they share with older ones, which are visited again without
+                self._visit(key, new, visits.visited(order[:order.index(new[0].buildno)]), trees)
+                again = visits.overlapping(order)
+                visits.drop(again)
+                self._visit(key, [b for b in builds if b.buildno in again],
+                            visits.visited(n for n in order if n not in again), trees)
+
+            with self.answers_lock:
+                self.trees[key] = [trees[number] for number in order if number in trees]
+                self.answers = dict((k, answer) for k, answer in self.answers.items() if k[:2] != key)
+            logger.info('Updated {0}: visited {1} new builds'.format(job, len(new)))
+
+    def _visit(self, key, builds, visited, trees):
+        vi = _Collector(self.client, self.cache, self.visits[key], visited)
+        tables = self.tables.setdefault(key, TestRuns().tables)
+        for root, matches, runs in tree_test_runs(self.runner, vi, builds):
+            tree = TestRuns(tables)
+            for run in runs:
+                tree.append(*run)
+            tree.builds[key[0]] = matches
+            trees[root.buildno] = (root.buildno, tree)
+
+    def _refresh(self):
+        while not self.stopping.wait(self.refresh):
+            for key in list(self.trees):
+                try:
+                    self.update(key)
+                except Exception:
+                    logger.exception('Could not update {0}'.format(key[0]))
+
+    # Server
+
+    def start(self, address=('127.0.0.1', 0)):
+        """Serve on ``(host, port)`` from background threads. Returns the address served on."""
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                daemon._handle(self)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.server = _Server(address, Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+        return self.address
+
+    @property
+    def address(self):
+        return '{0}:{1}'.format(*self.server.server_address[:2])
+
+    def stop(self):
+        self.stopping.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def serve(self, address):
+        """Serve until interrupted."""
+        logger.warning('Serving {0} on {1}'.format(self.settings['hostname'], self.start(address)))
+        try:
+            self.stopping.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handle(self, handler):
+        parts = urlsplit(handler.path)
+        try:
+            status, data = self._answer(parts.path.strip('/'),
+                                        dict((k, json.loads(v[0])) for k, v in parse_qs(parts.query).items()))
+        except Exception as e:
+            logger.exception('Could not answer {0}'.format(handler.path))
+            status, data = 500, {'error': str(e)}
+
+        body = json.dumps(data).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _answer(self, query, params):
+        if query == 'status':
+            return 200, {'settings': self.settings, 'jobs': sorted(set(job for job, _ in self.trees))}
+        elif query not in QUERIES:
+            return 404, {'error': 'No such query: {0}'.format(query)}
+
+        different = [name for name in SETTINGS if params.get(name) != self.settings.get(name)]
+        if different:
+            return 409, {'error': 'Serving with a different {0}'.format(', '.join(different))}
+
+        missing = [name for name in QUERIES[query] if name not in params]
+        if missing:
+            return 400, {'error': 'Missing {0}'.format(', '.join(missing))}
+
+        return 200, getattr(self, query)(*[params[name] for name in QUERIES[query]])
+
+
+def ask(address, query, params):
+    """Return a daemon's answer to a query, or None if it has none: it is not up, or serves other settings.
+
+    ``params`` are the query's arguments (see `QUERIES`) and the asker's settings (see `SETTINGS`)."""
+    url = '{0}/{1}?{2}'.format(address if '://' in address else 'http://' + address, query,
+                               urlencode(dict((k, json.dumps(v)) for k, v in params.items())))
+    try:
+        with urlopen(url, timeout=ASK_TIMEOUT) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except HTTPError as e:
+        (logger.info if e.code == 409 else logger.warning)('The daemon at {0} cannot answer ({1} {2}); '
+                                                           'asking Jenkins'.format(address, e.code, e.reason))
+    except (URLError, OSError) as e:
+        logger.info('No daemon at {0} ({1}); asking Jenkins'.format(address, e))
+
+    return None
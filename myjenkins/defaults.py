@@ -0,0 +1,6 @@
+import os
+
+# Defaults of the CLI's options, here so that it need not import the modules using them
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'myjenkins')
+DEFAULT_MAX_SIZE = 256 # MiB
+DEFAULT_DAEMON_PORT = 8642
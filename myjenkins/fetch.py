@@ -0,0 +1,184 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from jenkinsapi.artifact import Artifact
+from jenkinsapi.build import Build
+
+from .stats import phase
+
+# Everything myjenkins reads from a build. Full build JSON includes every action of
+# the build (causes, test counts, environment...), which often runs to hundreds of KB.
+BUILD_TREE = ('number,url,fullDisplayName,result,building,timestamp,'
+              'subBuilds[jobName,buildNumber],changeSet[kind,revisions[revision]],'
+              'actions[_class,parameters[name,value],lastBuiltRevision[SHA1,branch[SHA1,name]],mercurialNodeName,'
+              'totalCount]')
+
+# As `BUILD_TREE`, with the build's artifacts listed too
+ARTIFACTS_TREE = BUILD_TREE + ',artifacts[fileName,relativePath]'
+
+TREES = {
+    'build': BUILD_TREE,
+    'artifacts': ARTIFACTS_TREE,
+}
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+# Everything myjenkins reads from a test case, besides its stack trace. Cases in full
+# also include their stdout and stderr.
+RESULT_FIELDS = ('className', 'name', 'status', 'failedSince')
+
+
+class PrunedBuild(Build):
+    """A build with only the fields in `BUILD_TREE`. Never polls Jenkins for its own data."""
+
+    def __init__(self, job, buildno, data):
+        self.buildno = buildno
+        self.job = job
+        self.depth = 0
+        self._data = data
+        self.baseurl = self.strip_trailing_slash(data['url'])
+
+    def is_running(self):
+        return bool(self._data.get('building'))
+
+    # The revisions of other VCSs than git, which `Build.get_revision` looks for by changeSet.kind (and which newer
+    # versions of jenkinsapi no longer read)
+
+    def _get_svn_rev(self):
+        return max([r['revision'] for r in self._data['changeSet'].get('revisions') or []] or [0])
+
+    def _get_hg_rev(self):
+        return next((a['mercurialNodeName'] for a in self._data['actions'] if a and 'mercurialNodeName' in a), None)
+
+    def get_artifacts(self):
+        if 'artifacts' not in self._data:
+            return super(PrunedBuild, self).get_artifacts()
+
+        return (Artifact(a['fileName'], '{0}/artifact/{1}'.format(self.baseurl, quote(a['relativePath'])), self,
+                         relative_path=a['relativePath'])
+                for a in self._data['artifacts'])
+
+
+def get_build_metadata(job, number, tree=BUILD_TREE):
+    """As `Job.get_build_metadata`, but in a single request for only the fields myjenkins uses."""
+    url = job.python_api_url('{0}/{1}'.format(job.baseurl, number))
+    return PrunedBuild(job, number, job.get_data(url, tree=tree))
+
+
+def iter_builds(job, page_size=PAGE_SIZE, read_ahead=1):
+    """Yield a job's builds, newest first, fetching ``page_size`` of them (and their statuses) per request.
+
+    While a page is being yielded, up to ``read_ahead`` more are fetched in the
+    background, and each is twice the size of the last (up to `MAX_PAGE_SIZE`),
+    so long listings take few requests. Once the caller stops asking for
+    builds no more pages are requested."""
+    def get_page(start, end):
+        with phase('find builds'):
+            tree = 'allBuilds[{0}]{{{1},{2}}}'.format(BUILD_TREE, start, end)
+            return job.get_data(job.python_api_url(job.baseurl), tree=tree).get('allBuilds') or []
+
+    def pages():
+        start, size = 0, page_size
+        while True:
+            yield start, start + size
+            start, size = start + size, min(size * 2, max(page_size, MAX_PAGE_SIZE))
+
+    bounds = pages()
+    executor = ThreadPoolExecutor(max(read_ahead, 1))
+    pending = deque()
+
+    def request(n):
+        while len(pending) < n:
+            start, end = next(bounds)
+            pending.append((executor.submit(get_page, start, end), end - start))
+
+    request(1)
+    try:
+        while pending:
+            future, size = pending.popleft()
+            builds = future.result()
+
+            # A short page is the last, so only read ahead after full ones
+            full = len(builds) == size
+            if full:
+                request(read_ahead)
+
+            for data in builds:
+                yield PrunedBuild(job, data['number'], data)
+
+            if full:
+                request(1)
+    finally:
+        for future, _ in pending:
+            future.cancel() # Unless already running
+        executor.shutdown(wait=False)
+
+
+class TestResult(object):
+    """A test case with only the fields in `RESULT_FIELDS`, in place of a `jenkinsapi.result.Result`.
+
+    Its stack trace is fetched when first asked for (see `StackTraces`)."""
+
+    __slots__ = RESULT_FIELDS + ('stack_traces', 'index')
+
+    def __init__(self, className, name, status, failedSince, stack_traces=None, index=None):
+        self.className = className
+        self.name = name
+        self.status = status
+        self.failedSince = failedSince
+        self.stack_traces = stack_traces
+        self.index = index
+
+    def __str__(self):
+        return '{0} {1} {2}'.format(self.className, self.name, self.status)
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(self.__class__.__name__, self)
+
+    def identifier(self):
+        return '{0}.{1}'.format(self.className, self.name)
+
+    @property
+    def errorStackTrace(self):
+        return self.stack_traces[self.index] if self.stack_traces is not None else None
+
+
+class StackTraces(object):
+    """The stack traces of a build's test cases, by position, fetched in one request when first needed."""
+
+    def __init__(self, build):
+        self.build = build
+        self.lock = threading.Lock()
+        self.traces = None
+
+    def __getitem__(self, index):
+        with self.lock:
+            if self.traces is None:
+                self.traces = [case.get('errorStackTrace') for case in _get_cases(self.build, ['errorStackTrace'])]
+
+        return self.traces[index]
+
+
+def get_test_results(build):
+    """As `Build.get_resultset`, but fetching only `RESULT_FIELDS` of each case."""
+    return results_from(build, _get_cases(build, RESULT_FIELDS))
+
+
+def results_from(build, cases):
+    """Make `TestResult` objects from a build's test cases, in the order they appear in its report."""
+    stack_traces = StackTraces(build)
+
+    return [TestResult(*[case.get(f) for f in RESULT_FIELDS], stack_traces=stack_traces, index=i)
+            for i, case in enumerate(cases)]
+
+
+def _get_cases(build, fields):
+    """Return cases of a build's test report (and its child reports, as for matrix builds) in order."""
+    suites = 'suites[cases[{0}]]'.format(','.join(fields))
+    data = build.get_data(build.get_result_url(), tree='{0},childReports[result[{0}]]'.format(suites))
+
+    reports = [data] + [child['result'] for child in data.get('childReports') or [] if child.get('result')]
+    return [case for report in reports for suite in report.get('suites') or [] for case in suite['cases']]
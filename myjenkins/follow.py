@@ -0,0 +1,99 @@
+"""Following a job's builds as they finish, for `health --follow`."""
+import logging
+
+from requests.exceptions import HTTPError
+
+from .actions import reportable
+from .aggregate import FLAKES, FlakyAggregates
+from .cache import get_build
+from .report import test_run
+from .visitor import ExtendedTestCollector
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+POLL_TREE = 'builds[number,building]{0,50}'
+
+
+class Follower(object):
+    """Merges the test runs of a job's builds into `aggregate.FlakyAggregates` as the builds finish.
+
+    Each poll is one request for the numbers of the job's latest builds, and
+    whether they are running, plus one for each build which is not among them
+    but newer than the last update or running then. Only builds which have finished since the last
+    update are then fetched and visited. Their runs are merged as newer than
+    all those already merged, even if an older build was the last to finish,
+    and subbuilds already visited in the trees merged are not counted again."""
+
+    def __init__(self, client, runner, cache, job, aggregates, allow_failures=False):
+        self.client = client
+        self.runner = runner
+        self.cache = cache
+        self.job = job
+        self.aggregates = aggregates
+        self.allow_failures = allow_failures
+        self.last = aggregates.last_build # The newest build seen by the last update
+        self.running = set(aggregates.pending)
+
+    def poll(self):
+        """Return the numbers of builds which have finished since the last update, oldest first, with the number of
+        the newest build and those of the builds running."""
+        job = self.client[self.job]
+        builds = job.get_data(job.python_api_url(job.baseurl), tree=POLL_TREE).get('builds') or []
+        listed = set(b['number'] for b in builds)
+
+        # Builds which have run for so long that newer ones pushed them out of the listing, or which started after
+        # the last update but before all of those listed
+        missing = self.running - listed
+        if self.last is not None and listed:
+            missing.update(range(self.last + 1, min(listed)))
+
+        for number in sorted(missing):
+            try:
+                build = get_build(self.cache, job, number)
+            except HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+
+                logger.warning('Skipping {0} #{1}: it has been deleted'.format(self.job, number))
+                continue
+
+            builds.append({'number': number, 'building': build.is_running()})
+
+        finished = [] if self.last is None else \
+            sorted(b['number'] for b in builds
+                   if not b.get('building') and (b['number'] > self.last or b['number'] in self.running))
+
+        last = max([self.last or 0] + [b['number'] for b in builds])
+        running = set(b['number'] for b in builds if b.get('building'))
+
+        return finished, last, running
+
+    def update(self):
+        """Visit the builds which have finished since the last update, and merge in their test runs.
+
+        Returns ``(key, group before or None, group after)`` for each group (see
+        `aggregate.FlakyAggregates`) whose flakes have changed. If visiting the
+        builds fails, they are visited again on the next update."""
+        numbers, last, running = self.poll()
+        if not numbers:
+            self.last, self.running = last, running
+            return []
+
+        job = self.client[self.job]
+        builds = [b for b in (get_build(self.cache, job, n) for n in numbers) if reportable(b, self.allow_failures)]
+        old = self.aggregates
+        vi = ExtendedTestCollector(self.client, cache=self.cache, dedupe=True)
+        vi.visited.update((None, ref) for ref in old.subbuilds) # Shared with the trees already merged
+
+        runs = [test_run(result) for result in self.runner.run(vi, builds)] # Before counting what was visited
+        new = FlakyAggregates.of(runs, last_build=last, builds=vi.matches, pending=running,
+                                 subbuilds=(ref for _, ref in vi.visited))
+        logger.info('Merging {0} test runs from {1} new builds'.format(new.runs, len(builds)))
+
+        keys = sorted(new.groups)
+        new.merge(old)
+        self.aggregates = new
+        self.last, self.running = last, running
+
+        return [(key, old.groups.get(key), new.groups[key]) for key in keys
+                if new.groups[key][FLAKES] != old.groups.get(key, [0] * 5)[FLAKES]]
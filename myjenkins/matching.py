@@ -0,0 +1,78 @@
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from difflib import SequenceMatcher
+
+
+class ArtifactIndex(object):
+    """Finds the artifacts whose file names are most similar to a name, by `difflib.SequenceMatcher.ratio`.
+
+    Artifacts are sorted by name length, and the characters of their names
+    counted, which bound the ratio from above (as `SequenceMatcher.real_quick_ratio`
+    and `quick_ratio` do). So only names within a range of lengths are looked
+    at, and the exact (quadratic) ratio is only computed for those with the best
+    bounds, until enough matches are found.
+
+    Names are not indexed by their characters or n-grams: the ratio counts
+    matches of single characters too, so most names of a similar length share
+    enough of them to stay candidates."""
+
+    def __init__(self, artifacts):
+        self.entries = sorted(((len(a.filename), a.filename, a) for a in artifacts), key=lambda e: e[:2])
+        self.lengths = [e[0] for e in self.entries]
+        self.counts = [Counter(e[1]) for e in self.entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def similar(self, name, similarity, limit):
+        """Return up to ``limit`` artifacts whose names' ratio to ``name`` is over ``similarity``, as
+        ``(ratio, artifact)`` pairs, best first."""
+        counts = Counter(name)
+        shortlist = []
+
+        for i in range(*self._length_range(len(name), similarity)):
+            length, filename, artifact = self.entries[i]
+            bound = _ratio(sum((counts & self.counts[i]).values()), len(name) + length)
+            if bound > similarity:
+                shortlist.append((bound, filename, artifact))
+
+        # Best bounds first: once enough matches are better than the next bound, none can displace them
+        shortlist.sort(key=lambda s: (-s[0], s[1]))
+        matches = []
+
+        for bound, filename, artifact in shortlist:
+            if 0 < limit <= len(matches) and matches[limit - 1][0] > bound:
+                break
+
+            ratio = SequenceMatcher(a=name, b=filename, autojunk=False).ratio()
+            if ratio > similarity:
+                matches.append((ratio, filename, artifact))
+                matches.sort(key=lambda m: (-m[0], m[1]))
+
+        return [(ratio, artifact) for ratio, _, artifact in matches][:limit]
+
+    def _length_range(self, length, similarity):
+        """Return the range of entries whose lengths allow a ratio over ``similarity``.
+
+        The ratio is at most ``2 * min(a, b) / (a + b)`` for names of lengths ``a`` and ``b``."""
+        if similarity < 0:
+            return 0, len(self.entries)
+        elif similarity >= 1:
+            return 0, 0
+
+        # The range with some slack, then exactly as SequenceMatcher would calculate it
+        lo = bisect_right(self.lengths, int(length * similarity / (2 - similarity)) - 1)
+        hi = bisect_left(self.lengths, int(length * (2 - similarity) / similarity) + 2) if similarity > 0 \
+            else len(self.entries)
+
+        while lo < hi and _ratio(min(length, self.lengths[lo]), length + self.lengths[lo]) <= similarity:
+            lo += 1
+        while hi > lo and _ratio(min(length, self.lengths[hi - 1]), length + self.lengths[hi - 1]) <= similarity:
+            hi -= 1
+
+        return lo, hi
+
+
+def _ratio(matches, length):
+    # As difflib's
+    return 2.0 * matches / length if length else 1.0
@@ -1,7 +1,7 @@
 
 
 def output_frame(frame, html=False):
-    """Output the frame to console."""
+    """Output the frame (or anything rendering like one, e.g. a `Breakdown`) to console."""
     if frame.empty:
         return
 
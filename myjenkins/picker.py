@@ -1,45 +1,111 @@
+import copy
+
 from .util import PrettyRepr
 
 ANY = (2 ** 32) - 1 # HACK
 
 
 class Picker(PrettyRepr):
-    """Picks out values from visited nodes."""
+    """Picks out values from visited nodes.
+
+    Pickers are shared between the states of a traversal, so use `evaluated`
+    rather than `evaluate` on pickers which may be shared."""
+
+    __slots__ = ('pick_only', 'found_on', 'found_value', 'ruled_out_by')
 
     def __init__(self, pick_only=ANY):
         self.pick_only = pick_only
         self.found_on = None
         self.found_value = None
+        self.ruled_out_by = None
 
     def evaluate(self, build):
-        if not self.has_match:
-            picked = self.pick(build)
-            matches = self.pick_only == ANY or picked == self.pick_only
+        if not self.resolved:
+            self._update(build, self.pick(build))
+
+    def evaluated(self, build):
+        """Return this picker as it would be after evaluating ``build``, without changing it."""
+        if self.resolved:
+            return self
+
+        picked = self.pick(build)
+        if not self._matches(picked) and not self._rules_out(build, picked):
+            return self
+
+        other = copy.copy(self)
+        other._update(build, picked)
 
-            if picked is not None and matches:
-                self.found_on = build
-                self.found_value = picked
+        return other
+
+    def _matches(self, picked):
+        return picked is not None and (self.pick_only == ANY or picked == self.pick_only)
+
+    def _update(self, build, picked):
+        if self._matches(picked):
+            self.found_on = build
+            self.found_value = picked
+        elif self._rules_out(build, picked):
+            self.ruled_out_by = picked
+
+    def _rules_out(self, build, picked):
+        return bool(picked) and self.inherited(build, picked)
 
     def pick(self, build):
         raise NotImplementedError()
 
+    def inherited(self, build, picked):
+        """Whether all subbuilds of ``build`` are bound to pick ``picked`` too."""
+        return False
+
     @property
     def has_match(self):
         return self.found_on is not None
 
+    @property
+    def resolved(self):
+        """Whether evaluating more builds can no longer change anything."""
+        return self.has_match or not self.can_match
+
+    @property
+    def can_match(self):
+        """False once a value which no subbuild can change has failed to match."""
+        return self.ruled_out_by is None
+
 
 class Branch(Picker):
     """Picks out job branches."""
 
+    __slots__ = ()
+
     def pick(self, build):
         return build.get_params().get('BRANCH_NAME') or build._get_git_rev_branch()[0]['name']
 
+    def inherited(self, build, picked):
+        # Assumes that a build passes its own BRANCH_NAME to its subbuilds (see --branch). The branch checked out
+        # is not passed on, as subbuilds may check out other repositories.
+        return picked == build.get_params().get('BRANCH_NAME')
+
 
 class Revision(Picker):
     """Picks out build revision."""
 
+    __slots__ = ()
+
     def pick(self, build):
         try:
             return build.get_revision()
         except KeyError:
             return build._get_git_rev()
+
+    def inherited(self, build, picked):
+        # Revisions are checked out rather than passed to subbuilds, which may check out other repositories
+        return False
+
+
+class Job(Picker):
+    """Picks out job names, i.e. that of the first build evaluated (a tree's root)."""
+
+    __slots__ = ()
+
+    def pick(self, build):
+        return build.job.name
@@ -0,0 +1,82 @@
+"""What `health` and `summary` report, whether run from the CLI or by `myjenkins serve`."""
+from collections import deque
+
+from .cache import get_build
+from .matching import ArtifactIndex
+from .util import TestStatus, test_status
+from . import visitor
+
+MAX_AHEAD = 64 # Most trees `tree_test_runs` holds while an older one is unfinished
+
+
+def test_run(result):
+    """Flatten an `ExtendedTestCollector` result to the fields of a `columnar.TestRuns` row."""
+    test, branch, revision, job, timestamp, build = result
+    status = test_status(test)
+    return (test.identifier(),
+            str(branch or '?'),
+            str(revision or '?'),
+            int(status == TestStatus.SUCCESS),
+            int(status == TestStatus.FAILURE),
+            timestamp.timestamp(),
+            job,
+            build)
+
+
+def tree_test_runs(runner, vi, roots, ahead=MAX_AHEAD):
+    """Yield ``(root, builds collected, test runs)`` for the tree of each of ``roots``, in their order.
+
+    ``vi`` is a `visitor.TreeCollector`. Trees which finish ahead of those
+    before them are held until those have finished, so runs come newest
+    first, a tree at a time. No more roots are started while over ``ahead``
+    trees are held (see `runner.BaseRunner.run`)."""
+    started, finished = deque(), {}
+
+    def start(roots):
+        for root in roots:
+            started.append((root.job.name, root.buildno))
+            yield root
+
+    for bucket in runner.run(vi, start(roots), flatten=False, ahead=ahead):
+        root = bucket[0]
+        finished[(root.job.name, root.buildno)] = (root, bucket.count(None), [test_run(r) for r in bucket[1:] if r])
+
+        while started and started[0] in finished:
+            yield finished.pop(started.popleft())
+
+
+class BuildSummary(object):
+    """The builds of a build tree with their failed tests, and their artifacts indexed by name."""
+
+    def __init__(self, builds):
+        self.builds = builds
+        self.artifacts = dict((b.baseurl, ArtifactIndex(list(b.get_artifacts()))) for b, _ in builds)
+        self.all_artifacts = ArtifactIndex([a for b, _ in builds for a in b.get_artifacts()])
+
+    @classmethod
+    def collect(cls, client, runner, cache, job, build_id):
+        """Visit a build's tree; subbuilds are fetched (with their artifacts) in parallel."""
+        build = get_build(cache, job, build_id, kind='artifacts')
+        return cls(list(runner.run(visitor.SummaryCollector(client, cache=cache), [build])))
+
+    def failures(self, similarity, max_artifacts):
+        """Yield ``(test identifier, stack trace, artifact URLs)`` for each failed test.
+
+        Artifacts are those with names most similar to the test's, from its own build first."""
+        for build, failures in self.builds:
+            for failure in failures:
+                related = _similar_artifacts(failure.name, [self.artifacts[build.baseurl], self.all_artifacts],
+                                             similarity, max_artifacts)
+
+                yield failure.identifier(), failure.errorStackTrace, [artifact.url for _, artifact in related]
+
+
+def _similar_artifacts(name, indexes, similarity, max_artifacts):
+    related, urls = [], set()
+    for index in indexes:
+        for ratio, artifact in index.similar(name, similarity, max_artifacts):
+            if artifact.url not in urls and (max_artifacts < 0 or len(related) < max_artifacts):
+                related.append((ratio, artifact))
+                urls.add(artifact.url)
+
+    return related
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import fetch
+from .actions import set_build_description
+from .util import PrettyRepr
+from .watcher import Watcher
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+
+class RetryLoop(PrettyRepr):
+    """Reruns the failed tests of a build (and its children) until they pass, or ``max_attempts`` is reached."""
+
+    def __init__(self, job, build, max_attempts):
+        self.job = job
+        self.original = build
+        self.current = build
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self.failures = set()
+        self.error = None
+
+    async def run(self, call, watcher, collect):
+        """Run the loop, making requests with ``call(f, *args)`` and waiting on builds with ``watcher``."""
+        while True:
+            self.failures = await call(collect, self.current)
+            if not self.failures or self.attempts >= self.max_attempts:
+                break
+
+            # Retry the failed tests
+            print('Retrying {0} (attempt {1} of {2}; {3} tests still failing)...'.format(self.original,
+                                                                                         self.attempts + 1,
+                                                                                         self.max_attempts,
+                                                                                         len(self.failures)))
+
+            queued = await call(partial(self.job.invoke, build_params={'TEST_WHITELIST': '\n'.join(self.failures)}))
+            number = await watcher.started(queued)
+            triggered = await call(fetch.get_build_metadata, self.job, number)
+
+            await call(set_build_description, self.job.jenkins, triggered,
+                       'Retry of #{0}\'s failed tests'.format(self.current.buildno))
+
+            print('Waiting for {0} ...'.format(triggered.baseurl))
+            await watcher.finished(self.job, number)
+
+            # Retry those that failed again, again
+            self.current = await call(fetch.get_build_metadata, self.job, number)
+            self.attempts += 1
+
+    def report(self):
+        if self.error is not None:
+            return 'Error: {0}'.format(self.error)
+        elif self.attempts == 0:
+            return 'No tests have failed for that build'
+        elif self.failures:
+            return 'Failure: {0} test(s) are still failing after {1} attempts'.format(
+                len(self.failures), self.attempts + 1)
+        else:
+            return 'Success: all tests passed after {0} attempt(s)'.format(self.attempts + 1)
+
+
+def run_retries(loops, collect, concurrency, poll_interval=1.0, poll_rate=2.0):
+    """Run many retry loops at once, sharing one watcher for the builds they wait on."""
+    async def main():
+        loop = asyncio.get_event_loop()
+        watcher = Watcher(min_interval=poll_interval, rate=poll_rate)
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            async def call(f, *args):
+                return await loop.run_in_executor(executor, f, *args)
+
+            async def run(retry_loop):
+                try:
+                    await retry_loop.run(call, watcher, collect)
+                except Exception as e:
+                    logger.exception('Retrying {0} failed'.format(retry_loop.original))
+                    retry_loop.error = e
+
+            watching = asyncio.ensure_future(watcher.run(call))
+            try:
+                await asyncio.gather(*(run(retry_loop) for retry_loop in loops))
+            finally:
+                watching.cancel()
+                await asyncio.gather(watching, return_exceptions=True)
+
+    event_loop = asyncio.new_event_loop()
+    try:
+        event_loop.run_until_complete(main())
+    finally:
+        event_loop.close()
+
+    return loops
@@ -1,19 +1,27 @@
+import asyncio
 import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from itertools import islice
 from multiprocessing.dummy import Pool
 from multiprocessing import cpu_count
 from .picker import Branch, Revision
+from .stats import STATS
 from .util import format_dict
 
 logger = logging.getLogger('myjenkins') # FIXME Should use __name__
 
+_DONE = object()
 
-class Runner(object):
-    """Runs visitors concurrently."""
+
+class BaseRunner(object):
+    """Base class. Runs visitors over builds, within limits and requirements."""
 
     def __init__(self, branch=None, revision=None, hard_limit=-1, soft_limit=-1, concurrency=-1):
         self.concurrency = concurrency if concurrency > 0 else cpu_count()
-        self.pool = Pool(self.concurrency)
         self.hard_limit = hard_limit
         self.soft_limit = soft_limit
         self.requirements = []
@@ -24,26 +32,243 @@ class Runner(object):
         if revision:
             self.requirements.append(Revision(revision))
 
-    def run(self, visitor, builds, flatten=True):
-        if self.hard_limit > 0:
-            builds = islice(builds, self.hard_limit)
+    def run(self, visitor, builds, flatten=True, ahead=-1):
+        """Visit the trees of ``builds``, yielding results (or, unless ``flatten``, each tree's) as trees finish.
+
+        If ``ahead`` is 0 or more, no new tree is started while more than that
+        many have finished ahead of the oldest unfinished one. So callers
+        putting trees back in order hold few more than ``ahead``, however slow
+        the oldest is."""
+        raise NotImplementedError()
+
+    def limit(self, builds):
+        return islice(builds, self.hard_limit) if self.hard_limit > 0 else builds
+
+    def satisfied(self, visitor):
+        return 0 < self.soft_limit <= visitor.matches
+
+
+def _timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return result, time.perf_counter() - start
+
+
+class _Tree(object):
+    """Book-keeping for one build tree in flight."""
+
+    def __init__(self):
+        self.pending = 0
+        self.results = []
+        self.finished = False
+
+    def add(self, path, results):
+        self.results.append((path, results))
+
+    def bucket(self):
+        # Paths sort in pre-order, i.e. as a serial depth-first visit would have collected them
+        return [r for _, results in sorted(self.results, key=lambda r: r[0]) for r in results]
+
 
-        iterator = iter(builds)
-        no_soft_limit = self.soft_limit <= 0
+class Runner(BaseRunner):
+    """Runs visitors concurrently.
+
+    Work is scheduled per node of the build trees rather than per root, so
+    wide trees fan out over all workers. Subbuilds are queued ahead of new
+    roots, a new root is started whenever a worker would otherwise be idle,
+    and results are yielded as each tree finishes."""
+
+    def __init__(self, *args, **kwargs):
+        super(Runner, self).__init__(*args, **kwargs)
+        self._pool = None
+
+    @property
+    def pool(self):
+        """The worker threads, started when first needed."""
+        if self._pool is None:
+            self._pool = Pool(self.concurrency)
+
+        return self._pool
+
+    def run(self, visitor, builds, flatten=True, ahead=-1):
+        iterator = iter(self.limit(builds))
+        done = queue.Queue()
+        ready = deque()
+        trees = deque() # Those started, from the oldest unfinished
+        running = held = 0
+        starting = exhausted = False
+        busy, started = 0.0, time.perf_counter()
+
+        def step(tree, path, build, state):
+            return tree, path, state, visitor.step(build, state)
+
+        def fetch(tree, path, ref, state):
+            child = visitor.fetch(ref)
+            return tree, path, child, child and state.advance(child)
+
+        def start():
+            root = next(iterator, None)
+            return root, root and visitor.start(root, self.requirements)
 
         logger.info('Starting run ({0})'.format(format_dict(self.__dict__)))
 
-        while no_soft_limit or visitor.matches < self.soft_limit:
-            next_batch = list(islice(iterator, self.concurrency))
-            if not next_batch:
-                break # Exhausted all
+        while True:
+            while running < self.concurrency:
+                if ready:
+                    task = ready.popleft()
+                elif not (starting or exhausted or self.satisfied(visitor) or 0 <= ahead < held):
+                    # Only one root is requested at a time; the iterator isn't thread-safe
+                    task = (start, )
+                    starting = True
+                else:
+                    break
+
+                self.pool.apply_async(_timed, task,
+                                      callback=lambda r, f=task[0]: done.put((f, ) + r),
+                                      error_callback=done.put)
+                running += 1
+
+            if not running:
+                STATS.workers(self.concurrency, busy, time.perf_counter() - started)
+                break
 
-            buckets = self.pool.map(
-                lambda x: visitor.visit(x, self.requirements), next_batch)
-            logger.debug('Finished batch ({0} matched so far)'.format(visitor.matches))
+            outcome = done.get()
+            running -= 1
+
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+            f, r, elapsed = outcome
+            busy += elapsed
+            if f is start:
+                root, state = r
+                starting, exhausted = False, root is None
+                if root is not None:
+                    tree = _Tree()
+                    tree.pending = 1
+                    trees.append(tree)
+                    ready.append((step, tree, (), root, state))
+                continue
+            elif f is fetch:
+                tree, path, child, state = r
+                if child is not None:
+                    ready.appendleft((step, tree, path, child, state))
+                    continue
+            else:
+                tree, path, state, (results, refs) = r
+                tree.add(path, results)
+                tree.pending += len(refs)
+                ready.extendleft((fetch, tree, path + (i, ), ref, state) for i, ref in reversed(list(enumerate(refs))))
+
+            tree.pending -= 1
+            if tree.pending:
+                continue
+
+            logger.debug('Finished tree ({0} matched so far)'.format(visitor.matches))
+
+            tree.finished = True
+            held += 1
+            while trees and trees[0].finished:
+                trees.popleft()
+                held -= 1
+
+            bucket = tree.bucket()
+            if flatten:
+                yield from bucket
+            else:
+                yield bucket
+
+
+class AsyncRunner(BaseRunner):
+    """Runs visitors on an asyncio event loop, fetching subbuilds concurrently.
+
+    Jenkins calls block, so they run on a thread pool with at most
+    ``concurrency`` in flight. Results are yielded as each build tree
+    finishes rather than per batch."""
+
+    def run(self, visitor, builds, flatten=True, ahead=-1):
+        buckets = queue.Queue()
+        stopping = threading.Event()
+        thread = threading.Thread(target=self._run_loop, args=(visitor, builds, buckets.put, stopping, ahead),
+                                  daemon=True)
+
+        logger.info('Starting async run ({0})'.format(format_dict(self.__dict__)))
+        thread.start()
+
+        try:
+            while True:
+                bucket = buckets.get()
+                if bucket is _DONE:
+                    break
+                elif isinstance(bucket, BaseException):
+                    raise bucket
 
-            for result_bucket in buckets:
                 if flatten:
-                    yield from result_bucket
+                    yield from bucket
                 else:
-                    yield result_bucket
+                    yield bucket
+        finally:
+            stopping.set()
+
+    def _run_loop(self, visitor, builds, emit, stopping, ahead):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._run(visitor, builds, emit, stopping, ahead))
+        except Exception as e:
+            emit(e)
+        finally:
+            loop.close()
+            emit(_DONE)
+
+    async def _run(self, visitor, builds, emit, stopping, ahead):
+        loop = asyncio.get_event_loop()
+        in_flight = asyncio.Semaphore(self.concurrency)
+
+        async def call(f, *args):
+            nonlocal busy
+            async with in_flight:
+                result, elapsed = await loop.run_in_executor(executor, _timed, f, *args)
+                busy += elapsed
+                return result
+
+        async def visit(build, state):
+            results, refs = await call(visitor.step, build, state)
+            children = await asyncio.gather(*(call(visitor.fetch, ref) for ref in refs))
+            buckets = await asyncio.gather(*(visit(child, state.advance(child))
+                                             for child in children if child is not None))
+
+            return results + [r for bucket in buckets for r in bucket]
+
+        async def visit_root(build):
+            return await visit(build, visitor.start(build, self.requirements))
+
+        iterator = iter(self.limit(builds))
+        pending = set()
+        trees = deque() # Those started, from the oldest unfinished
+        exhausted = False
+        busy, started = 0.0, time.perf_counter()
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            while True:
+                # Keep up to `concurrency` trees going; each fans out over its own subbuilds
+                while not exhausted and len(pending) < self.concurrency and \
+                        not self.satisfied(visitor) and not stopping.is_set() and \
+                        not 0 <= ahead < len(trees) - len(pending):
+                    root = await call(next, iterator, None)
+                    if root is None:
+                        exhausted = True
+                    else:
+                        trees.append(asyncio.ensure_future(visit_root(root)))
+                        pending.add(trees[-1])
+
+                if not pending:
+                    STATS.workers(self.concurrency, busy, time.perf_counter() - started)
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    emit(task.result())
+                while trees and trees[0].done():
+                    trees.popleft()
+
+                logger.debug('Finished {0} tree(s) ({1} matched so far)'.format(len(done), visitor.matches))
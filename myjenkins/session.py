@@ -0,0 +1,63 @@
+import logging
+import threading
+
+from jenkinsapi.jenkins import Jenkins
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+RETRIES = 3
+RETRY_STATUSES = (500, 502, 503, 504)
+RETRY_BACKOFF = 0.25 # Seconds before the second retry, doubling after
+
+
+class Client(Jenkins):
+    """A `Jenkins` client which makes each job object once, and shares it between threads.
+
+    A new `Job` polls Jenkins for its data, and visitors look up the job of
+    every subbuild they fetch."""
+
+    def __init__(self, *args, **kwargs):
+        self._job_objects = {}
+        self._job_locks = {}
+        self._lock = threading.Lock()
+        super(Client, self).__init__(*args, **kwargs)
+
+    def get_job(self, jobname):
+        with self._lock:
+            lock = self._job_locks.setdefault(jobname, threading.Lock())
+
+        # Only one thread makes each job, while others wait for it
+        with lock:
+            if jobname not in self._job_objects:
+                self._job_objects[jobname] = super(Client, self).get_job(jobname)
+
+        return self._job_objects[jobname]
+
+    def __getitem__(self, jobname):
+        return self.get_job(jobname)
+
+
+def configure_pool(client, size, retries=RETRIES, backoff=RETRY_BACKOFF):
+    """Size the client's keep-alive connection pool for ``size`` concurrent requests, and retry failed reads.
+
+    requests keeps 10 connections per host by default and discards the rest,
+    so busier runs would otherwise reconnect for most requests. Reads which
+    fail with a server error (as Jenkins' do now and then, under load) are
+    retried up to ``retries`` times, backing off."""
+    requester = client.requester
+    session = getattr(requester, 'session', None)
+    if session is None:
+        logger.warning('Cannot configure the connection pool of {0}'.format(requester))
+        return
+
+    adapter = HTTPAdapter(pool_connections=size,
+                          pool_maxsize=size,
+                          max_retries=Retry(total=retries,
+                                            backoff_factor=backoff,
+                                            status_forcelist=RETRY_STATUSES,
+                                            allowed_methods=frozenset(['GET', 'HEAD']),
+                                            raise_on_status=False)) # Let jenkinsapi raise for the last response
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
@@ -0,0 +1,150 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')) # seconds
+
+_ENDPOINTS = [
+    ('testReport', re.compile(r'/testReport(/|$)')),
+    ('artifact', re.compile(r'/artifact/')),
+    ('queue', re.compile(r'/queue/item/')),
+    ('crumb', re.compile(r'/crumbIssuer/')),
+    ('build metadata', re.compile(r'/job/[^/]+(/job/[^/]+)*/\d+(/api/\w+)?/?$')),
+    ('job', re.compile(r'/job/[^/]+(/job/[^/]+)*(/api/\w+)?/?$')),
+    ('jobs', re.compile(r'^(/[^/]+)*/api/\w+/?$')),
+]
+
+
+def classify(method, url, params=None):
+    """Return the type of Jenkins endpoint a request is for."""
+    path = re.sub(r'^\w+://[^/]+', '', url).split('?')[0]
+    if method != 'GET':
+        return 'post'
+
+    for endpoint, pattern in _ENDPOINTS:
+        if pattern.search(path):
+            tree = (params or {}).get('tree', '') if isinstance(params, dict) else ''
+            if endpoint == 'job' and re.match(r'(all)?[bB]uilds\b', tree):
+                return 'job build list'
+
+            return endpoint
+
+    return 'other'
+
+
+class Stats(object):
+    """Counts Jenkins API requests by endpoint type, with latency histograms and bytes transferred.
+
+    Also accumulates the time spent in each phase of a run (summed over
+    threads) and how busy the runner's workers were."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.start = time.time()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.bytes = Counter()
+        self.latency = Counter()
+        self.histograms = defaultdict(lambda: [0] * len(BUCKETS))
+        self.phases = Counter()
+        self.calls = Counter()
+        self.worker_capacity = 0.0
+        self.worker_busy = 0.0
+
+    def record(self, endpoint, elapsed, size, status):
+        with self.lock:
+            self.requests[endpoint] += 1
+            self.errors[endpoint] += int(status >= 400)
+            self.bytes[endpoint] += size
+            self.latency[endpoint] += elapsed
+            self.histograms[endpoint][bisect_left(BUCKETS, elapsed)] += 1
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.phases[name] += elapsed
+                self.calls[name] += 1
+
+    def workers(self, concurrency, busy, wall):
+        """Record that ``concurrency`` workers were busy for ``busy`` seconds out of ``wall``."""
+        with self.lock:
+            self.worker_capacity += concurrency * wall
+            self.worker_busy += busy
+
+    def summary(self):
+        with self.lock:
+            return {
+                'elapsed': time.time() - self.start,
+                'requests': dict((endpoint, {
+                    'count': n,
+                    'errors': self.errors[endpoint],
+                    'bytes': self.bytes[endpoint],
+                    'latency_total': self.latency[endpoint],
+                    'latency_histogram': dict(zip(map(str, BUCKETS), self.histograms[endpoint])),
+                }) for endpoint, n in self.requests.items()),
+                'phases': dict((name, {'seconds': seconds, 'calls': self.calls[name]})
+                               for name, seconds in self.phases.items()),
+                'worker_utilisation': self.worker_busy / self.worker_capacity if self.worker_capacity else None,
+            }
+
+    def format(self):
+        summary = self.summary()
+        lines = ['{0:<16} {1:>8} {2:>6} {3:>10} {4:>9}  latency histogram (<= s: n)'.format(
+            'endpoint', 'requests', 'errors', 'KiB', 'mean (ms)')]
+
+        for endpoint, r in sorted(summary['requests'].items(), key=lambda r: -r[1]['count']):
+            histogram = ', '.join('{0}: {1}'.format(bucket, n) for bucket, n in r['latency_histogram'].items() if n)
+            lines.append('{0:<16} {1:>8} {2:>6} {3:>10.1f} {4:>9.1f}  {5}'.format(
+                endpoint, r['count'], r['errors'], r['bytes'] / 1024.0, 1000 * r['latency_total'] / r['count'],
+                histogram))
+
+        lines.append('{0} requests in {1:.2f}s'.format(sum(r['count'] for r in summary['requests'].values()),
+                                                       summary['elapsed']))
+
+        for name, p in sorted(summary['phases'].items()):
+            lines.append('{0}: {1:.2f}s over {2} calls (summed over threads)'.format(name, p['seconds'], p['calls']))
+
+        if summary['worker_utilisation'] is not None:
+            lines.append('Workers busy {0:.0%} of the time'.format(summary['worker_utilisation']))
+
+        return '\n'.join(lines)
+
+
+STATS = Stats()
+phase = STATS.phase
+
+
+def instrument(requester, stats=STATS):
+    """Record every request a jenkinsapi requester makes."""
+    def wrap(method, f):
+        def wrapper(url, *args, **kwargs):
+            params = kwargs.get('params', args[0] if args else None)
+            start = time.perf_counter()
+            response = f(url, *args, **kwargs)
+            elapsed = time.perf_counter() - start
+
+            if kwargs.get('stream'):
+                size = int(response.headers.get('Content-Length') or 0)
+            else:
+                size = len(response.content or b'')
+
+            stats.record(classify(method, url, params), elapsed, size, response.status_code)
+            return response
+
+        return wrapper
+
+    requester.get_url = wrap('GET', requester.get_url)
+    requester.post_url = wrap('POST', requester.post_url)
+
+    return requester
@@ -0,0 +1,421 @@
+"""A fake Jenkins server which serves deterministic, generated jobs over HTTP.
+
+Each top-level job ``job-<i>`` has builds ``1..builds``, ``builds_per_revision``
+of them per branch and revision. Every build triggers a tree of subbuilds,
+``fan_out[d]`` wide at depth ``d``, whose leaves publish JUnit-style test
+reports; subbuilds share their root's build number. Top-level jobs build
+their own repositories, unless ``shared_repo``: then they run the same tests
+on the same revisions, each starting its builds a minute after the last. Requests
+can be slowed down with ``latency`` and failed at random with ``error_rate``,
+and `stats` reports what was requested."""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, unquote, urlsplit
+
+BRANCHES = ['master', 'feature/a', 'feature/b']
+EPOCH = 1500000000000 # ms
+
+_API = r'/api/(?:python|json)/?'
+_ROUTES = [
+    ('root', re.compile(r'^' + _API + r'$')),
+    ('crumb', re.compile(r'^/crumbIssuer' + _API + r'$')),
+    ('job', re.compile(r'^/job/([^/]+)' + _API + r'$')),
+    ('build', re.compile(r'^/job/([^/]+)/(\d+)' + _API + r'$')),
+    ('testReport', re.compile(r'^/job/([^/]+)/(\d+)/testReport' + _API + r'$')),
+    ('artifact', re.compile(r'^/job/([^/]+)/(\d+)/artifact/(.+)$')),
+    ('queue', re.compile(r'^/queue/item/(\d+)' + _API + r'$')),
+    ('invoke', re.compile(r'^/job/([^/]+)/build(?:WithParameters)?/?$')),
+    ('description', re.compile(r'^/job/([^/]+)/(\d+)/submitDescription/?$')),
+]
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    """Serves each request on its own thread."""
+
+    daemon_threads = True
+
+
+def parse_tree(tree):
+    """Parse a Jenkins ``tree=`` expression into ``{field: (subtree, range)}``."""
+    fields, rest = _parse_fields(tree.replace(' ', ''))
+    if rest:
+        raise ValueError('Unexpected {0!r} in tree'.format(rest))
+
+    return fields
+
+
+def _parse_fields(s):
+    fields = {}
+    while s:
+        name = re.match(r'[\w$]*', s).group(0)
+        s = s[len(name):]
+        subtree = span = None
+
+        if s.startswith('['):
+            subtree, s = _parse_fields(s[1:])
+            s = s[1:] # ]
+        if s.startswith('{'):
+            bounds, s = s[1:].split('}', 1)
+            lower, comma, upper = bounds.partition(',')
+            span = (int(lower or 0), int(upper) if upper else None) if comma else (int(lower), int(lower) + 1)
+
+        fields[name] = (subtree, span)
+
+        if s.startswith(','):
+            s = s[1:]
+        elif s.startswith(']') or not s:
+            break
+
+    return fields, s
+
+
+def apply_tree(data, tree):
+    """Keep only the fields of ``data`` selected by a parsed tree."""
+    if isinstance(data, list):
+        return [apply_tree(d, tree) for d in data]
+    elif not isinstance(data, dict):
+        return data
+
+    pruned = {}
+    for name, (subtree, span) in tree.items():
+        if name not in data:
+            continue
+
+        value = data[name]
+        if span is not None and isinstance(value, list):
+            value = value[span[0]:span[1]]
+        if subtree is not None:
+            value = apply_tree(value, subtree)
+
+        pruned[name] = value
+
+    return pruned
+
+
+class FakeJenkins(object):
+    """Generates Jenkins data and serves it (see module docstring)."""
+
+    def __init__(self, jobs=1, builds=10, fan_out=(2, ), tests=20, failure_rate=0.05, payload=200,
+                 artifacts=5, builds_per_revision=3, latency=0.0, error_rate=0.0, build_duration=0.0, shared_repo=False,
+                 seed=0):
+        self.jobs = ['job-{0}'.format(i) for i in range(jobs)]
+        self.builds = builds
+        self.fan_out = tuple(fan_out)
+        self.tests = tests
+        self.failure_rate = failure_rate
+        self.payload = payload
+        self.artifacts = artifacts
+        self.builds_per_revision = builds_per_revision
+        self.latency = latency
+        self.error_rate = error_rate
+        self.build_duration = build_duration
+        self.shared_repo = shared_repo
+        self.seed = seed
+
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.bytes = Counter()
+        self.queue = {}
+        self.triggered = {} # (job, number) -> (whitelist, started)
+        self.server = None
+
+    # Server
+
+    def start(self):
+        """Serve on an ephemeral local port. Returns the base URL."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake._handle(self, 'GET')
+
+            def do_POST(self):
+                fake._handle(self, 'POST')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}'.format(*self.server.server_address[:2])
+
+    def stats(self):
+        """Requests and bytes served, by endpoint type."""
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'bytes': dict(self.bytes),
+                'total_requests': sum(self.requests.values()),
+                'total_bytes': sum(self.bytes.values()),
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+            self.bytes.clear()
+
+    def _handle(self, handler, method):
+        parts = urlsplit(handler.path)
+        query = parse_qs(parts.query)
+
+        if method == 'POST':
+            body = handler.rfile.read(int(handler.headers.get('Content-Length') or 0))
+            query.update(parse_qs(body.decode('utf-8')))
+
+        for kind, pattern in _ROUTES:
+            match = pattern.match(parts.path)
+            if match:
+                break
+        else:
+            kind, match = 'unknown', None
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.requests[kind] += 1
+            failed = kind in ('build', 'testReport') and self.random.random() < self.error_rate
+
+        status, body, headers = 404, b'Not found', {}
+        if failed:
+            status, body = 500, b'Random failure'
+        elif match:
+            args = [unquote(g) for g in match.groups()]
+            result = getattr(self, '_' + kind)(method, query, *args)
+            if result is not None:
+                status, body, headers = result
+
+        with self.lock:
+            self.bytes[kind] += len(body)
+
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _json(self, data, query):
+        if 'tree' in query:
+            data = apply_tree(data, parse_tree(query['tree'][0]))
+
+        return 200, json.dumps(data).encode('utf-8'), {'Content-Type': 'application/json'}
+
+    # Endpoints
+
+    def _root(self, method, query):
+        return self._json({'jobs': [{'name': name, 'color': 'blue', 'url': self.job_url(name)}
+                                    for name in self.all_jobs()]}, query)
+
+    def _crumb(self, method, query):
+        return None # Crumbs are disabled
+
+    def _job(self, method, query, name):
+        if name not in self.all_jobs():
+            return None
+
+        numbers = self.build_numbers(name)
+        builds = [{'number': n, 'url': self.build_url(name, n)} for n in numbers]
+        completed = [b for b in builds if not self.is_running(name, b['number'])]
+
+        return self._json({
+            'name': name,
+            'url': self.job_url(name),
+            'actions': [{'parameterDefinitions': [{'name': 'TEST_WHITELIST'}, {'name': 'BRANCH_NAME'}]}],
+            # As with Jenkins, build details are only included when asked for with tree=
+            'builds': [self.build_data(name, n) for n in numbers] if 'tree' in query else builds,
+            'allBuilds': [self.build_data(name, n) for n in numbers] if 'tree' in query else builds,
+            'firstBuild': builds[-1] if builds else None,
+            'lastBuild': builds[0] if builds else None,
+            'lastCompletedBuild': completed[0] if completed else None,
+            'nextBuildNumber': (numbers[0] if numbers else 0) + 1,
+            'property': [],
+        }, query)
+
+    def _build(self, method, query, name, number):
+        number = int(number)
+        if number not in self.build_numbers(name):
+            return None
+
+        return self._json(self.build_data(name, number), query)
+
+    def _testReport(self, method, query, name, number):
+        number = int(number)
+        if number not in self.build_numbers(name) or not self.is_leaf(name):
+            return None
+
+        return self._json({'suites': [{'name': name, 'cases': self.cases(name, number)}]}, query)
+
+    def _artifact(self, method, query, name, number, path):
+        return 200, ('Report for {0}'.format(path) * 10).encode('utf-8'), {'Content-Type': 'text/plain'}
+
+    def _queue(self, method, query, item):
+        if int(item) not in self.queue:
+            return None
+
+        name, number = self.queue[int(item)]
+        return self._json({
+            'id': int(item),
+            'task': {'name': name, 'url': self.job_url(name)},
+            'executable': {'number': number, 'url': self.build_url(name, number)},
+        }, query)
+
+    def _invoke(self, method, query, name):
+        if method != 'POST' or name not in self.jobs:
+            return None
+
+        whitelist = query.get('TEST_WHITELIST', [''])[0].split('\n') if 'TEST_WHITELIST' in query else None
+        with self.lock:
+            number = self.build_numbers(name)[0] + 1
+            for job in self.tree_jobs(name):
+                self.triggered[(job, number)] = (whitelist, time.time())
+            item = len(self.queue) + 1
+            self.queue[item] = (name, number)
+
+        return 201, b'', {'Location': '{0}/queue/item/{1}/'.format(self.url, item)}
+
+    def _description(self, method, query, name, number):
+        return 200, b'', {}
+
+    # Data
+
+    def job_url(self, name):
+        return '{0}/job/{1}'.format(self.url, name)
+
+    def build_url(self, name, number):
+        return '{0}/job/{1}/{2}/'.format(self.url, name, number)
+
+    def all_jobs(self):
+        return [job for root in self.jobs for job in self.tree_jobs(root)]
+
+    def tree_jobs(self, name, depth=0):
+        """Return a job and all its descendant jobs."""
+        jobs = [name]
+        for child in self.child_jobs(name, depth):
+            jobs += self.tree_jobs(child, depth + 1)
+
+        return jobs
+
+    def child_jobs(self, name, depth=None):
+        depth = name.count('.') if depth is None else depth
+        if depth >= len(self.fan_out):
+            return []
+
+        return ['{0}.{1}'.format(name, k) for k in range(self.fan_out[depth])]
+
+    def is_leaf(self, name):
+        return not self.child_jobs(name)
+
+    def build_numbers(self, name):
+        """All build numbers of a job, newest first."""
+        extra = [n for job, n in self.triggered if job == name]
+        return sorted(set(range(1, self.builds + 1)) | set(extra), reverse=True)
+
+    def is_running(self, name, number):
+        whitelist, started = self.triggered.get((name, number), (None, None))
+        return started is not None and time.time() - started < self.build_duration
+
+    def root_number(self, number):
+        return number if number <= self.builds else ((number - 1) % self.builds) + 1
+
+    def build_data(self, name, number):
+        root = name.split('.')[0]
+        commit = (self.root_number(number) - 1) // self.builds_per_revision
+        branch = BRANCHES[commit % len(BRANCHES)]
+        repo = 'repo' if self.shared_repo else root
+        revision = hashlib.sha1('{0}-{1}'.format(repo, commit).encode('utf-8')).hexdigest()
+        running = self.is_running(name, number)
+        failed = self.is_leaf(name) and any(c['status'] in ('FAILED', 'REGRESSION')
+                                            for c in self.cases(name, number))
+
+        actions = [
+            {'_class': 'hudson.model.ParametersAction',
+             'parameters': [{'name': 'BRANCH_NAME', 'value': branch}]},
+            {'_class': 'hudson.plugins.git.util.BuildData',
+             'lastBuiltRevision': {'SHA1': revision, 'branch': [{'SHA1': revision, 'name': 'origin/' + branch}]},
+             'remoteUrls': ['git@example.com:example/repo.git']},
+            {'_class': 'hudson.model.CauseAction',
+             'causes': [{'shortDescription': 'Started by timer'}] * 20},
+        ]
+        if self.is_leaf(name):
+            actions.append({'_class': 'hudson.tasks.junit.TestResultAction',
+                            'totalCount': self.tests, 'failCount': 0, 'skipCount': 0,
+                            'urlName': 'testReport'})
+
+        return {
+            '_class': 'hudson.model.FreeStyleBuild',
+            'number': number,
+            'url': self.build_url(name, number),
+            'fullDisplayName': '{0} #{1}'.format(name, number),
+            'displayName': '#{0}'.format(number),
+            'description': None,
+            'building': running,
+            'result': None if running else ('UNSTABLE' if failed else 'SUCCESS'),
+            'timestamp': EPOCH + number * 3600 * 1000 + self.jobs.index(root) * 60 * 1000,
+            'duration': 60000,
+            'estimatedDuration': int(self.build_duration * 1000) or 60000,
+            'keepLog': False,
+            'builtOn': 'agent-1',
+            'actions': actions,
+            'changeSet': {'kind': 'git', 'items': []},
+            'subBuilds': [{'jobName': child, 'buildNumber': number, 'result': 'SUCCESS',
+                           'url': 'job/{0}/{1}/'.format(child, number)} for child in self.child_jobs(name)],
+            'artifacts': [{'fileName': 'Test{0}.html'.format(a), 'displayPath': 'Test{0}.html'.format(a),
+                           'relativePath': 'reports/{0}/Test{1}.html'.format(name, a)}
+                          for a in range(self.artifacts if self.is_leaf(name) else 0)],
+        }
+
+    def cases(self, name, number):
+        whitelist, _ = self.triggered.get((name, number), (None, None))
+        retried = (name, number) in self.triggered
+        cases = []
+
+        for t in range(self.tests):
+            suite = name.partition('.')[2] if self.shared_repo else name
+            class_name = 'com.example.{0}.Test{1}'.format(suite.replace('.', '_'), t // 5)
+            if retried and whitelist is not None and class_name not in whitelist:
+                continue
+
+            digest = hashlib.md5('{0}:{1}:{2}:{3}'.format(self.seed, name, number, t).encode('utf-8')).digest()
+            failed = not retried and digest[0] / 256.0 < self.failure_rate
+
+            cases.append({
+                'className': class_name,
+                'name': 'test{0}'.format(t),
+                'status': 'FAILED' if failed else 'PASSED',
+                'failedSince': number if failed else 0,
+                'duration': 0.5,
+                'age': 1 if failed else 0,
+                'skipped': False,
+                'errorDetails': 'expected true' if failed else None,
+                'errorStackTrace': ('java.lang.AssertionError\n' + '\tat com.example.Foo.bar(Foo.java:1)\n' * 20)
+                if failed else None,
+                'stdout': 'x' * self.payload,
+                'stderr': None,
+            })
+
+        return cases
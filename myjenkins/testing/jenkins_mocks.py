@@ -20,7 +20,7 @@ def create_job(name):
 
 def create_build(buildno):
     """Creates a configurable mock build."""
-    build = Mock(dir(Build) + ['_data'], name='Build-{0}'.format(buildno))
+    build = Mock(dir(Build) + ['_data', 'job'], name='Build-{0}'.format(buildno))
 
     build.buildno = buildno
     build.has_resultset = M(
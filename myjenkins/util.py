@@ -1,3 +1,6 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
 
 
 class TestStatus(object):
@@ -22,7 +25,62 @@ def subset(d, keys):
     return dict((k, d[k]) for k in keys if k in d)
 
 
+def is_glob(pattern):
+    return any(c in pattern for c in '*?[')
+
+
 class PrettyRepr(object):
+    __slots__ = ()
+
     def __repr__(self):
         return '<{0}: {1}>'.format(self.__class__.__name__,
-                                   format_dict(self.__dict__))
+                                   format_dict(_fields(self)))
+
+
+def _fields(o):
+    fields = dict((name, getattr(o, name)) for cls in type(o).__mro__
+                  for name in getattr(cls, '__slots__', ()) if hasattr(o, name))
+    fields.update(getattr(o, '__dict__', {}))
+
+    return fields
+
+
+class Memo(object):
+    """Values made once per key, however many threads ask for them at the same time.
+
+    The first thread to ask for a key makes its value, and those asking
+    meanwhile wait for it and share it (or its error). Values are kept for
+    later asks too: all of them, the ``keep`` most recently made if it is a
+    number, or none if it is false. Errors never are."""
+
+    def __init__(self, keep=True):
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.kept = deque() # Keys of the values kept, oldest first, if only some are
+
+    def get(self, key, make, *args):
+        with self.lock:
+            future = self.futures.get(key)
+            first = future is None
+            if first:
+                future = self.futures[key] = Future()
+
+        if first:
+            try:
+                future.set_result(make(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    if not self.keep or future.exception() is not None:
+                        del self.futures[key]
+                    elif self.keep is not True:
+                        self.kept.append(key)
+                        while len(self.kept) > self.keep:
+                            del self.futures[self.kept.popleft()]
+
+        return future.result()
+
+    def __len__(self):
+        return len(self.futures)
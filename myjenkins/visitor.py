@@ -1,86 +1,176 @@
-from itertools import chain
-import copy
 import logging
+import threading
+from collections import Counter
 from requests.exceptions import HTTPError
 from jenkinsapi.custom_exceptions import NotFound
-from .util import PrettyRepr, TestStatus, test_status
-from .picker import Branch, Revision
+from .cache import get_build, get_results
+from .util import Memo, PrettyRepr, TestStatus, test_status
+from .picker import Branch, Revision, Job
+from .stats import phase
 
 logger = logging.getLogger('myjenkins') # FIXME Should use __name__
 
+KEEP_BUILDS = 1000 # Fetched builds kept for other trees, besides those being fetched
+
 
 class BranchState(PrettyRepr):
-    """The state of one branch of the tree traversal."""
+    """The state of one branch of the tree traversal.
+
+    States are never changed once made: advancing returns a new state which
+    shares its parent's pickers, except for those changed by the new build."""
+
+    __slots__ = ('depth', 'requirements', 'trackers', 'root')
 
-    def __init__(self, requirements=None, trackers=None, depth=-1):
+    def __init__(self, requirements=None, trackers=None, depth=-1, root=None):
         self.depth = depth
-        self.requirements = requirements or []
-        self.trackers = trackers or []
+        self.requirements = tuple(requirements or ())
+        self.trackers = tuple(trackers or ())
+        self.root = root
 
     def advance(self, next_build):
-        next_state = copy.deepcopy(self)
-        next_state.depth += 1
-
-        for p in chain(next_state.requirements, next_state.trackers):
-            p.evaluate(next_build)
+        next_state = BranchState(_evaluated(self.requirements, next_build),
+                                 _evaluated(self.trackers, next_build),
+                                 self.depth + 1,
+                                 next_build if self.root is None else self.root)
 
-        logger.debug('Evaluated {0}: {1}'.format(next_build, next_state))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Evaluated {0}: {1}'.format(next_build, next_state))
 
         return next_state
 
+    @property
+    def satisfiable(self):
+        """Whether this branch, or any below it, can still satisfy the requirements."""
+        return all(p.can_match for p in self.requirements)
+
+
+def _evaluated(pickers, build):
+    evaluated = tuple(p.evaluated(build) for p in pickers)
+    return pickers if all(a is b for a, b in zip(evaluated, pickers)) else evaluated
+
 
 class BuildVisitor(object):
     """Base class. Visits nodes of a build tree."""
 
-    def __init__(self, client, trackers=None):
+    kind = 'build' # What to fetch of each build (see `fetch.TREES`)
+
+    def __init__(self, client, trackers=None, cache=None, dedupe=False, per_job=False):
         self.client = client
         self.trackers = trackers or []
+        self.cache = cache
+        self.visited = set() if dedupe else None
+        self.per_job = per_job
+        self.lock = threading.Lock()
+        self.builds = Memo(keep=KEEP_BUILDS) # (job name, build number) -> build, recently fetched
+        self.resultsets = Memo(keep=False) # Only shared while being fetched
         self.reset()
 
     def reset(self):
         self.matches = 0
 
     def visit(self, root, requirements=None):
-        state = BranchState(requirements, self.trackers).advance(root)
+        return list(self._visit(root, self.start(root, requirements)))
 
-        return list(self._visit(root, state))
+    def start(self, root, requirements=None):
+        """Return the state with which to visit ``root``."""
+        return BranchState(requirements, self.trackers).advance(root)
 
     def _visit(self, build, state):
+        results, refs = self.step(build, state)
+        yield from results
+
+        for child in filter(None, map(self.fetch, refs)):
+            yield from self._visit(child, state.advance(child))
+
+    def step(self, build, state):
+        """Visit a single node. Returns its results and references to the children to visit next."""
         logger.debug('{0} {1}'.format('*' * (state.depth + 1), build))
 
+        if not state.satisfiable:
+            logger.info('Skipping {0} and its subbuilds: requirements cannot be met'.format(build))
+
+        return [], []
+
     def collect(self, build, state):
         logger.info('Collecting {0}'.format(build))
-        self.matches += 1
+        with self.lock:
+            self.matches += 1
 
         return build
 
     def can_collect(self, build, state):
         return all(p.has_match for p in state.requirements)
 
-    def children(self, build):
-        for sb in build._data.get('subBuilds', []):
-            try:
-                yield self.client[sb['jobName']].get_build_metadata(sb['buildNumber'])
-            except (NotFound, HTTPError):
-                pass # FIXME Random 500s from Jenkins
+    def children(self, build, state):
+        return filter(None, map(self.fetch, self.child_refs(build, state)))
+
+    def child_refs(self, build, state):
+        """Return references to the subbuilds of ``build`` to visit, those yet to be visited in its tree's job."""
+        return [ref for ref in [(sb['jobName'], sb['buildNumber']) for sb in build._data.get('subBuilds', [])]
+                if self.first_visit(ref, state.root.job.name)]
+
+    def first_visit(self, ref, job):
+        """Whether a ``(job name, build number)`` is yet to be visited, in a tree of ``job``. Always true, unless
+        deduplicating.
+
+        Subbuilds shared between trees (e.g. by pipelines triggering the same
+        jobs) are then only visited, and their results collected, once; or,
+        ``per_job``, once for each job whose trees share them."""
+        if self.visited is None:
+            return True
+
+        key = (job if self.per_job else None, ref)
+        with self.lock:
+            first = key not in self.visited
+            self.visited.add(key)
+
+        return first
+
+    def unvisited(self, builds):
+        """Yield those of ``builds`` (roots) yet to be visited."""
+        return (b for b in builds if self.first_visit((b.job.name, b.buildno), b.job.name))
+
+    def fetch(self, ref):
+        """Return the build for a ``(job name, build number)`` reference, or None if it is unavailable.
+
+        Threads asking for a build being fetched wait for it, and the builds
+        fetched last are kept for trees sharing them (when not deduplicating,
+        or per job). Builds are not kept for the whole run, so that memory
+        does not grow with the number of builds visited."""
+        try:
+            return self.builds.get(ref, self._fetch, ref)
+        except (NotFound, HTTPError) as e:
+            logger.warning('Skipping {0} #{1}: {2}'.format(ref[0], ref[1], e)) # Even after retrying
+            return None
+
+    def _fetch(self, ref):
+        job_name, number = ref
+        with phase('fetch subbuilds'):
+            return get_build(self.cache, self.client[job_name], number, self.kind)
 
 
 class TestCollector(BuildVisitor):
     """Collects all test results for a build run."""
 
-    def _visit(self, build, state):
-        super(TestCollector, self)._visit(build, state)
+    def step(self, build, state):
+        super(TestCollector, self).step(build, state)
+
+        if not state.satisfiable:
+            return [], []
 
-        children = list(self.children(build))
-        if children:
-            for child in children:
-                yield from self._visit(child, state.advance(child))
+        refs = self.child_refs(build, state)
+        if build._data.get('subBuilds'): # Even if its subbuilds were visited in other trees
+            return [], refs
         elif self.can_collect(build, state):
-            yield from self.collect(build, state)
+            return list(self.collect(build, state)), []
+
+        return [], []
 
     def collect(self, build, state):
         super(TestCollector, self).collect(build, state)
-        return (v for k, v in build.get_resultset().items())
+
+        with phase('collect results'):
+            return iter(self.resultsets.get((build.job.name, build.buildno), get_results, self.cache, build))
 
     def can_collect(self, build, state):
         return build.has_resultset() and \
@@ -88,34 +178,73 @@ class TestCollector(BuildVisitor):
 
 
 class ExtendedTestCollector(TestCollector):
-    """As `TestCollector`, but also includes the test's revision, branch and timestamp."""
+    """As `TestCollector`, but also includes the test's branch, revision, job and timestamp, and the build number.
+
+    The job and build number are those of the tree's root. Builds collected are
+    also counted per job, in ``job_matches``."""
+
+    def __init__(self, client, cache=None, dedupe=False, per_job=False):
+        super(TestCollector, self).__init__(client, (Branch(), Revision(), Job()), cache, dedupe, per_job)
 
-    def __init__(self, client):
-        super(TestCollector, self).__init__(client, (Branch(), Revision()))
+    def reset(self):
+        super(ExtendedTestCollector, self).reset()
+        self.job_matches = Counter()
 
     def collect(self, build, state):
+        values = tuple(t.found_value for t in state.trackers)
+        root = state.trackers[-1].found_on # Where the job was picked
+        with self.lock:
+            self.job_matches[values[-1]] += 1
+
         for test in super(ExtendedTestCollector, self).collect(build, state):
-            yield (test, ) + tuple(t.found_value for t in state.trackers) + (build.get_timestamp(), )
+            yield (test, ) + values + (build.get_timestamp(), root.buildno)
+
+
+class TreeCollector(ExtendedTestCollector):
+    """As `ExtendedTestCollector`, but each tree's results start with its root, and each build collected adds None.
+
+    Run with ``flatten=False``, so that each tree's results come together (see `report.tree_test_runs`)."""
+
+    def step(self, build, state):
+        results, refs = super(TreeCollector, self).step(build, state)
+        return ([build] if state.depth == 0 else []) + results, refs
+
+    def collect(self, build, state):
+        yield None
+        yield from super(TreeCollector, self).collect(build, state)
 
 
 class FailedTestCollector(TestCollector):
     """As `TestCollector`, but only collects failed tests."""
 
-    def visit(self, root, requirements=None):
-        return [t for t in super(FailedTestCollector, self).visit(root) if test_status(t) == TestStatus.FAILURE]
+    def collect(self, build, state):
+        return (t for t in super(FailedTestCollector, self).collect(build, state)
+                if test_status(t) == TestStatus.FAILURE)
+
+
+class SummaryCollector(FailedTestCollector):
+    """As `FailedTestCollector`, but collects each build of the tree with its failed tests.
+
+    Builds are fetched with their artifacts listed."""
+
+    kind = 'artifacts'
+
+    def step(self, build, state):
+        results, refs = super(SummaryCollector, self).step(build, state)
+        return ([(build, results)] if state.satisfiable else []), refs
 
 
 class SubbuildCollector(BuildVisitor):
     """Collects all subbuilds for a test."""
 
-    def _visit(self, build, state):
-        super(SubbuildCollector, self)._visit(build, state)
+    def step(self, build, state):
+        super(SubbuildCollector, self).step(build, state)
 
-        if self.can_collect(build, state):
-            yield self.collect(build, state)
+        if not state.satisfiable:
+            return [], []
 
-        for child in self.children(build):
-            yield from self._visit(child, state.advance(child))
+        results = [self.collect(build, state)] if self.can_collect(build, state) else []
+        return results, self.child_refs(build, state)
 
     def can_collect(self, build, state):
         return state.depth > 0 and \
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from requests.exceptions import HTTPError
+
+from .util import PrettyRepr
+
+logger = logging.getLogger('myjenkins') # FIXME Should use __name__
+
+BACKOFF = 1.5
+BUILDS_TREE = 'builds[number,building,result,timestamp,estimatedDuration]{0,50}'
+
+
+class Watch(PrettyRepr):
+    """Something being waited for: a queue item to start, or a build to finish."""
+
+    def __init__(self, future, interval, queued=None, job=None, number=None):
+        self.future = future
+        self.interval = interval
+        self.due = 0.0
+        self.queued = queued
+        self.job = job
+        self.number = number
+
+
+class Watcher(object):
+    """Waits for queue items to start and builds to finish, many at once, from one task.
+
+    Checks are made one at a time (and so over one connection), at most ``rate``
+    a second, and cover all the watched builds of a job at once. A running build
+    is next checked when its job's usual duration says it should be done; after
+    that, and for queue items, the time between checks grows from
+    ``min_interval`` to ``max_interval``."""
+
+    def __init__(self, min_interval=1.0, max_interval=60.0, rate=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.rate = rate
+        self.watches = []
+        self.changed = asyncio.Event()
+
+    async def started(self, queued):
+        """Return the number of the build started by a queue item."""
+        return await self._watch(queued=queued)
+
+    async def finished(self, job, number):
+        """Return the result of a build once it has finished."""
+        return await self._watch(job=job, number=number)
+
+    async def _watch(self, **kwargs):
+        watch = Watch(asyncio.get_event_loop().create_future(), self.min_interval, **kwargs)
+        self.watches.append(watch)
+        self.changed.set()
+
+        return await watch.future
+
+    async def run(self, call):
+        """Check on watches until cancelled, making requests with ``call(f, *args)``."""
+        loop = asyncio.get_event_loop()
+
+        while True:
+            self.changed.clear()
+            due = [w for w in self.watches if w.due <= loop.time()]
+
+            for queued in [w for w in due if w.queued is not None]:
+                await self._check(call, [queued], self._check_queued)
+
+            by_job = OrderedDict()
+            for build in [w for w in due if w.job is not None]:
+                by_job.setdefault(build.job.name, []).append(build)
+
+            for builds in by_job.values():
+                await self._check(call, builds, self._check_builds)
+
+            wake = min([w.due for w in self.watches] or [loop.time() + self.max_interval])
+            try:
+                await asyncio.wait_for(self.changed.wait(), max(0.0, wake - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, call, watches, f):
+        loop = asyncio.get_event_loop()
+        try:
+            outcomes = await call(f, watches)
+        except Exception as e:
+            outcomes = [(e, None)] * len(watches)
+
+        for watch, (result, remaining) in zip(watches, outcomes):
+            if watch.future.done():
+                self.watches.remove(watch) # Cancelled
+            elif isinstance(result, Exception):
+                self.watches.remove(watch)
+                watch.future.set_exception(result)
+            elif result is not None:
+                self.watches.remove(watch)
+                watch.future.set_result(result)
+            else:
+                watch.due = loop.time() + self._delay(watch, remaining)
+
+        await asyncio.sleep(1.0 / self.rate)
+
+    def _delay(self, watch, remaining):
+        """Return how long to wait before checking on ``watch`` again."""
+        if remaining is not None and remaining > watch.interval:
+            return min(remaining, self.max_interval)
+
+        delay = watch.interval
+        watch.interval = min(watch.interval * BACKOFF, self.max_interval)
+
+        return delay
+
+    @staticmethod
+    def _check_queued(watches):
+        """Return ``(build number or None, None)`` for a queue item's watch."""
+        try:
+            data = watches[0].queued.poll(tree='executable[number]')
+        except HTTPError as e:
+            logger.debug(str(e))
+            return [(None, None)]
+
+        return [((data.get('executable') or {}).get('number'), None)]
+
+    @staticmethod
+    def _check_builds(watches):
+        """Return ``(result or None, seconds until expected to finish)`` for watches of a job's builds."""
+        job = watches[0].job
+        builds = dict((b['number'], b) for b in job.get_data(job.python_api_url(job.baseurl),
+                                                             tree=BUILDS_TREE).get('builds') or [])
+        outcomes = []
+
+        for watch in watches:
+            data = builds.get(watch.number)
+            if data is None: # Not among the most recent builds
+                data = job.get_data(job.python_api_url('{0}/{1}'.format(job.baseurl, watch.number)),
+                                    tree='number,building,result,timestamp,estimatedDuration')
+
+            if not data.get('building'):
+                outcomes.append((data.get('result') or 'UNKNOWN', None))
+            else:
+                expected = (data.get('timestamp', 0) + max(data.get('estimatedDuration', 0), 0)) / 1000.0
+                outcomes.append((None, expected - time.time()))
+
+        return outcomes
@@ -10,6 +10,9 @@ setup(
         'click',
         'jenkinsapi>=0.3.4',
         'colorama',
+        'numpy',
+        'requests>=2.25', # The first to allow urllib3 1.26
+        'urllib3>=1.26', # For Retry(allowed_methods=...)
     ],
     extras_require={
         'pandas': ['pandas']
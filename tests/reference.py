@@ -0,0 +1,64 @@
+"""Reference implementations which tests check myjenkins against, and the test runs they are checked on."""
+import random
+from collections import OrderedDict
+import numpy as np
+from myjenkins.columnar import TestRuns
+
+
+def random_records(n, ties=False):
+    """Return ``n`` test runs, as `columnar.TestRuns.append` takes them, of 3 tests on 2 branches and revisions.
+
+    Their timestamps tie if ``ties``, or else are unique, so that the order of each group's runs is well-defined."""
+    rng = random.Random(n)
+    records = []
+    for i in range(n):
+        test, branch, revision = rng.choice(['b', 'a', 'c']), rng.choice(['master', 'dev']), rng.choice('yx')
+        failure = rng.randint(0, 1)
+        records.append((test, branch, revision, 1 - failure, failure, float(rng.randint(0, 50) if ties else i)))
+
+    return records
+
+
+def make_runs(records):
+    """Return `columnar.TestRuns` holding ``records``."""
+    runs = TestRuns()
+    for record in records:
+        runs.append(*record)
+
+    return runs
+
+
+def flaky_breakdown(frame, min_builds=2, group_by_test=False):
+    """Generate a breakdown of flaky tests by branch and revision, as a pandas frame of test runs.
+
+    What health reported on before `columnar.TestRuns`."""
+    import pandas as pd
+
+    group_by = ['test', 'branch', 'revision'] if group_by_test else ['branch', 'revision', 'test']
+
+    frame = frame.sort_values('timestamp', ascending=False, kind='stable')
+    grouped = frame.groupby(group_by)
+    codes = grouped.ngroup().values
+    n = grouped.ngroups
+
+    # Stable, so each group's runs stay newest first. Then a failure following a success is the
+    # test going from failing to passing, i.e. a flake.
+    order = np.argsort(codes, kind='stable')
+    codes, failure = codes[order], frame['failure'].values[order]
+    flakes = (failure[1:] > failure[:-1]) & (codes[1:] == codes[:-1])
+
+    success = np.bincount(codes, weights=frame['success'].values[order], minlength=n).astype(np.int64)
+    failure = np.bincount(codes, weights=failure, minlength=n).astype(np.int64)
+    flakes = np.bincount(codes[1:][flakes], minlength=n)
+    total = success + failure
+
+    keep = (total >= min_builds) & (flakes > 0)
+    index = grouped.size().index[keep]
+
+    # Calculate flakiness value (total runs / number of test status changes)
+    return pd.DataFrame(OrderedDict([
+        (('success', 'n'), success[keep]),
+        (('failure', 'n'), failure[keep]),
+        (('total', ''), total[keep]),
+        (('flakiness %', ''), np.round(flakes[keep] / total[keep] * 200, decimals=1)),
+    ]), index=index)
@@ -1,14 +1,15 @@
 import pytest
+from datetime import datetime, timezone
 from mock import Mock
 from requests.exceptions import HTTPError
 from jenkinsapi.constants import STATUS_ABORTED, STATUS_FAIL, STATUS_ERROR
 from jenkinsapi.custom_exceptions import NotFound
-from myjenkins.actions import find_recent_builds
+from myjenkins.actions import find_failed_builds, find_jobs, find_recent_builds
 from myjenkins.testing import jenkins_mocks
 
 
 @pytest.fixture
-def job():
+def job(mock_fetch):
     """Fixture. Returns a job which has 3 builds."""
     job = jenkins_mocks.create_job('foo')
     job._builds = {i + 1: jenkins_mocks.create_build(i + 1) for i in range(3)}
@@ -45,3 +46,27 @@ def test_ignore_abnormal_jobs(job, exception):
     job.get_build_metadata = Mock(side_effect=exception)
 
     assert not list(find_recent_builds(job))
+
+
+def test_find_failed_builds(mock_fetch):
+    """Return finished builds with failures, newest first, until one started before the cutoff"""
+    job = jenkins_mocks.create_job('foo')
+    for number, status in [(6, None), (5, 'FAILURE'), (4, 'SUCCESS'), (3, 'UNSTABLE'), (2, 'FAILURE'), (1, 'UNSTABLE')]:
+        build = job._builds[number] = jenkins_mocks.create_build(number)
+        build.get_status.return_value = status
+        build.is_running.return_value = status is None
+        build.get_timestamp.return_value = datetime.fromtimestamp(number * 3600, timezone.utc)
+
+    assert [b.buildno for b in find_failed_builds(job, 2 * 3600)] == [5, 3, 2]
+    assert not list(find_failed_builds(job, 7 * 3600))
+
+
+def test_find_jobs():
+    """Expand globs of job names, in folders too"""
+    client = jenkins_mocks.create_client()
+    client.keys.return_value = ['app', 'app-deploy', 'pipeline']
+    client._jobs['pipeline'] = jenkins_mocks.create_job('pipeline')
+    client._jobs['pipeline']._data = {'jobs': [{'name': 'master'}, {'name': 'develop'}]}
+
+    assert find_jobs(client, ['app*', 'pipeline/*', 'app', 'other']) == \
+        ['app', 'app-deploy', 'pipeline/develop', 'pipeline/master', 'other']
@@ -0,0 +1,82 @@
+import random
+from myjenkins.aggregate import FlakyAggregates, SpillingAggregates
+
+# (test, branch, revision, failure), newest first
+RUNS = [
+    ('foo', 'master', 'a', 0),
+    ('foo', 'master', 'a', 1),
+    ('bar', 'master', 'a', 1),
+    ('foo', 'master', 'a', 0),
+    ('foo', 'master', 'a', 1),
+    ('bar', 'master', 'a', 0),
+    ('foo', 'master', 'b', 1),
+]
+
+
+def _aggregate(runs, **kwargs):
+    aggregates = FlakyAggregates(**kwargs)
+    for test, branch, revision, failure in runs:
+        aggregates.add((test, branch, revision), 1 - failure, failure)
+
+    return aggregates
+
+
+def test_counts_flakes():
+    """Count each change from failing to passing"""
+    aggregates = _aggregate(RUNS)
+
+    assert aggregates.groups[('foo', 'master', 'a')][:3] == [2, 2, 2]
+    assert aggregates.groups[('bar', 'master', 'a')][:3] == [1, 1, 0]
+    assert aggregates.runs == len(RUNS)
+    assert aggregates.tests == set(['foo', 'bar'])
+
+
+def test_merge_matches_single_pass():
+    """Merging older aggregates gives the same result as adding all runs at once"""
+    rng = random.Random(0)
+    runs = [(rng.choice('ab'), 'master', 'a', rng.randint(0, 1)) for _ in range(200)]
+
+    for split in [0, 1, 50, 199, 200]:
+        merged = _aggregate(runs[:split])
+        merged.merge(_aggregate(runs[split:]))
+
+        assert merged.groups == _aggregate(runs).groups
+
+
+def test_breakdown():
+    """Only report flaky groups seen often enough"""
+    breakdown = _aggregate(RUNS).breakdown(min_builds=2)
+
+    assert breakdown.index == [('master', 'a', 'foo')]
+    assert [c[0] for c in breakdown.columns.values()] == [2, 2, 4, 100.0]
+
+
+def test_save_load(tmpdir):
+    """Round-trip through a file"""
+    path = str(tmpdir.join('state.json'))
+    _aggregate(RUNS, last_build=10, builds=3, subbuilds=[('sub', 9), ('sub', 10)]).save(path)
+    loaded = FlakyAggregates.load(path)
+
+    assert loaded.groups == _aggregate(RUNS).groups
+    assert (loaded.last_build, loaded.builds) == (10, 3)
+    assert loaded.subbuilds == set([('sub', 9), ('sub', 10)])
+
+
+def test_spill(tmpdir):
+    """Report the same from parts written to disk as from aggregates in memory"""
+    rng = random.Random(0)
+    trees = [[('test{0}'.format(rng.randint(0, 30)), rng.choice('ab'), 'a', 1 - failure, failure, -t)
+              for failure in (rng.randint(0, 1) for _ in range(20))] for t in range(50)]
+    expected = FlakyAggregates()
+    spilling = SpillingAggregates(str(tmpdir), max_groups=10, partitions=4)
+
+    for runs in trees:
+        expected.add_runs(runs)
+        spilling.add_runs(runs)
+
+    breakdown, spilled = expected.breakdown(), spilling.breakdown()
+
+    assert spilling.spilled > 1 and len(tmpdir.listdir()) == 4 * spilling.spilled
+    assert spilled.index == breakdown.index
+    assert all((spilled.columns[c] == breakdown.columns[c]).all() for c in breakdown.columns)
+    assert (spilling.tests, spilling.runs) == (expected.tests, expected.runs)
@@ -0,0 +1,53 @@
+import numpy as np
+from myjenkins.aggregate import FlakyAggregates
+from tests.reference import make_runs, random_records
+
+
+def _rows(breakdown):
+    return dict(zip(breakdown.index, zip(*[c.tolist() for c in breakdown.columns.values()])))
+
+
+def _reference(records, min_builds=2):
+    """Brute-force breakdown: walk each group's runs newest first."""
+    groups = {}
+    for test, branch, revision, _, failure, timestamp in records:
+        groups.setdefault((branch, revision, test), []).append((timestamp, failure))
+
+    rows = {}
+    for key, runs in groups.items():
+        failures = [failure for _, failure in sorted(runs, reverse=True)]
+        flakes = sum(1 for newer, older in zip(failures, failures[1:]) if older > newer)
+
+        if len(failures) >= min_builds and flakes > 0:
+            rows[key] = (len(failures) - sum(failures), sum(failures), len(failures),
+                         np.round(flakes / len(failures) * 200, decimals=1))
+
+    return rows
+
+
+def test_flaky_breakdown():
+    """Count flakes per group, newest first"""
+    records = random_records(500)
+    breakdown = make_runs(records).breakdown()
+
+    assert _rows(breakdown) == _reference(records)
+    assert breakdown.index == sorted(breakdown.index)
+
+
+def test_group_by_test():
+    """Index by test first"""
+    breakdown = make_runs(random_records(100)).breakdown(min_builds=1, group_by_test=True)
+
+    assert breakdown.names == ['test', 'branch', 'revision']
+    assert breakdown.index == sorted(breakdown.index)
+
+
+def test_matches_aggregates():
+    """Give the same breakdown as running aggregates"""
+    records = random_records(1000)
+
+    aggregates = FlakyAggregates()
+    for test, branch, revision, success, failure, _ in reversed(records):
+        aggregates.add((test, branch, revision), success, failure)
+
+    assert aggregates.breakdown().to_dict() == make_runs(records).breakdown().to_dict()
@@ -0,0 +1,105 @@
+import os
+import pytest
+from mock import Mock
+from jenkinsapi.result import Result
+from myjenkins.cache import BuildCache, get_build, get_results
+from myjenkins.visitor import TestCollector
+
+
+@pytest.fixture
+def cache(tmpdir):
+    """Fixture. Returns an empty cache."""
+    return BuildCache(str(tmpdir.join('cache.sqlite')))
+
+
+def _add_data(client):
+    for name in ['top', 'sub_1', 'sub_2']:
+        build = client[name][1]
+        build.job = client[name]
+        build._data.update(url='http://jenkins/job/{0}/1/'.format(name),
+                           fullDisplayName='{0} #1'.format(name),
+                           result='SUCCESS',
+                           actions=[{'totalCount': 1}])
+        build.get_resultset = Mock(return_value={name: Result(className='com.foo', name=name, status='PASSED')})
+
+    for name in ['sub_1', 'sub_2']:
+        job = client[name]
+        job.get_build_metadata = Mock(side_effect=job.get_build_metadata)
+
+
+def test_roundtrip(cache):
+    """Return what was stored"""
+    cache.put('foo', 1, 'build', {'result': 'SUCCESS'})
+
+    assert cache.get('foo', 1, 'build') == {'result': 'SUCCESS'}
+    assert cache.get('foo', 2, 'build') is None
+    assert cache.get('foo', 1, 'resultset') is None
+
+
+def test_evicts_least_recently_used(tmpdir):
+    """Evict the least recently used entries once over the size limit"""
+    cache = BuildCache(str(tmpdir.join('cache.sqlite')), max_size=100)
+    cache.put('foo', 1, 'build', {'n': 1})
+    cache.put('foo', 2, 'build', {'n': 2})
+    cache.get('foo', 1, 'build')
+    cache.put('foo', 3, 'build', {'n': os.urandom(64).hex()})
+
+    assert cache.size <= 100
+    assert cache.get('foo', 2, 'build') is None
+
+
+def test_records_reads(tmpdir):
+    """Keep the size of replaced entries, and what was read, across runs"""
+    path = str(tmpdir.join('cache.sqlite'))
+    cache = BuildCache(path, max_size=100)
+    cache.put('foo', 1, 'build', {'n': 1})
+    cache.put('foo', 2, 'build', {'n': 2})
+    cache.put('foo', 2, 'build', {'n': 2})
+    size = cache.size
+    cache.get('foo', 1, 'build')
+    cache.close()
+
+    cache = BuildCache(path, max_size=100)
+    assert cache.size == size
+    cache.put('foo', 3, 'build', {'n': os.urandom(32).hex()})
+
+    assert cache.get('foo', 1, 'build') == {'n': 1}
+    assert cache.get('foo', 2, 'build') is None
+
+
+def test_get_build_from_cache(client, cache):
+    """Fetch a finished build only once"""
+    _add_data(client)
+    job = client['sub_1']
+
+    assert get_build(cache, job, 1) is client['sub_1'][1]
+
+    build = get_build(cache, job, 1)
+    assert build.get_status() == 'SUCCESS'
+    assert not build.is_running()
+    assert job.get_build_metadata.call_count == 1
+
+
+def test_ignore_running(client, cache):
+    """Never cache running builds"""
+    _add_data(client)
+    client['sub_1'][1].is_running.return_value = True
+
+    get_build(cache, client['sub_1'], 1)
+    get_results(cache, client['sub_1'][1])
+
+    assert cache.size == 0
+
+
+def test_visit_from_cache(client, cache):
+    """Collect the same tests without refetching subbuilds or their results"""
+    _add_data(client)
+    top = client['top'][1]
+
+    first = set(t.name for t in TestCollector(client, cache=cache).visit(top))
+    fetched = client['sub_1'][1].get_resultset.call_count
+    second = set(t.name for t in TestCollector(client, cache=cache).visit(top))
+
+    assert first == second == set(['sub_1', 'sub_2'])
+    assert client['sub_1'].get_build_metadata.call_count == 1
+    assert client['sub_1'][1].get_resultset.call_count == fetched
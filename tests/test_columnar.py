@@ -0,0 +1,109 @@
+import sys
+import numpy as np
+import pytest
+from myjenkins.columnar import StringTable, TestRuns
+from tests.reference import make_runs, random_records
+
+
+def test_string_table():
+    """Intern strings, and rank them in sorted order"""
+    table = StringTable(['b', 'c', 'a', 'b'])
+    ranks, order = table.ranks()
+
+    assert table.strings == ['b', 'c', 'a']
+    assert list(ranks) == [1, 2, 0]
+    assert [table.strings[c] for c in order] == ['a', 'b', 'c']
+
+
+@pytest.mark.parametrize('group_by_test', [False, True])
+@pytest.mark.parametrize('min_builds', [1, 2, 10])
+def test_matches_flaky_breakdown(group_by_test, min_builds):
+    """Give the same breakdown as pandas, timestamp ties included"""
+    pd = pytest.importorskip('pandas')
+    from tests.reference import flaky_breakdown
+
+    records = random_records(2000, ties=True)
+    runs = make_runs(records)
+
+    frame = pd.DataFrame.from_records(records, columns=('test', 'branch', 'revision', 'success', 'failure',
+                                                        'timestamp'))
+
+    assert len(runs) == len(records)
+    assert runs.tests == 3
+    pd.testing.assert_frame_equal(runs.breakdown(min_builds, group_by_test).to_frame(),
+                                  flaky_breakdown(frame, min_builds, group_by_test))
+
+
+def test_empty():
+    """Break down no runs at all"""
+    assert TestRuns().breakdown().empty
+
+
+def test_render_without_pandas(monkeypatch):
+    """Render plain tables without pandas"""
+    monkeypatch.setitem(sys.modules, 'pandas', None) # So importing it fails
+    runs = TestRuns()
+    for record in [('a', 'dev', 'x', 0, 1, 1.0), ('a', 'dev', 'x', 1, 0, 2.0), ('b<c>', 'master', 'y', 0, 1, 2.0),
+                   ('b<c>', 'master', 'y', 1, 0, 3.0), ('b<c>', 'master', 'y', 0, 1, 4.0)]:
+        runs.append(*record)
+
+    breakdown = runs.breakdown()
+
+    assert breakdown.to_string().splitlines() == [
+        'branch  revision  test  success n  failure n  total  flakiness %',
+        'dev     x         a     1          1          2      100.0',
+        'master  y         b<c>  1          2          3      66.7',
+    ]
+    assert '<td>b&lt;c&gt;</td><td>1</td><td>2</td><td>3</td><td>66.7</td>' in breakdown.to_html()
+
+
+def test_concatenate():
+    """Put runs sharing their string tables together, with only the strings they use"""
+    records = random_records(300, ties=True)
+    expected, shared = TestRuns(), TestRuns().tables
+    parts = [TestRuns(shared) for _ in range(3)]
+    for i, record in enumerate(records):
+        parts[i // 100].append(*record)
+        if i < 200:
+            expected.append(*record)
+    parts[2].append('d', 'master', 'x', 1, 0, 0.0) # Only in a part left out
+
+    runs = TestRuns.concatenate(parts[:2])
+
+    assert len(runs) == 200 and runs.tests == 3
+    assert runs.breakdown(1).to_dict() == expected.breakdown(1).to_dict()
+    assert not TestRuns.concatenate([])
+
+
+def test_save_load(tmpdir):
+    """Load saved runs, mapping their columns, and break them down the same"""
+    path = str(tmpdir.join('runs.npz'))
+    runs = TestRuns()
+    for i, record in enumerate(random_records(500, ties=True)):
+        runs.append(*record, job='job-{0}'.format(i % 2), build=i // 10)
+    runs.builds.update({'job-0': 25, 'job-1': 25, 'job-2': 1})
+
+    runs.save(path)
+    loaded = TestRuns.load(path)
+
+    assert len(loaded) == len(runs) and loaded.tests == runs.tests
+    assert isinstance(loaded.timestamp, np.memmap)
+    assert list(loaded.build) == list(runs.build)
+    assert loaded.builds == runs.builds
+    assert loaded.breakdown().to_dict() == runs.breakdown().to_dict()
+
+
+def test_select():
+    """Select the runs of some jobs"""
+    runs = TestRuns()
+    runs.append('a', 'master', 'x', 1, 0, 1.0, job='job-0')
+    runs.append('b', 'master', 'x', 0, 1, 1.0, job='job-1')
+    runs.append('c', 'master', 'x', 1, 0, 2.0, job='job-0')
+    runs.builds.update({'job-0': 2, 'job-1': 1})
+
+    selected = runs.select(['job-0'])
+
+    assert len(selected) == 2 and selected.tests == 2
+    assert selected.jobs == ['job-0']
+    assert selected.builds == {'job-0': 2}
+    assert len(runs.select(['job-2'])) == 0
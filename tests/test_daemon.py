@@ -0,0 +1,133 @@
+import time
+import pytest
+from myjenkins.__main__ import Obj
+from myjenkins.daemon import Daemon, _Visits
+
+CONFIG = dict(branch=None, revision=None, soft_limit=-1, hard_limit=50, concurrency=4)
+
+
+@pytest.fixture
+def daemon(fake):
+    """Fixture. Returns a daemon serving the fake server."""
+    o = Obj(fake.url, None, None, 'threads', None, 256, True, None, dict(CONFIG))
+    with Daemon(o.client, o.make_runner(soft_limit=-1), o.make_runner(), o.cache, fake.url, o.config) as daemon:
+        yield daemon
+
+
+def test_health(invoke, fake, daemon):
+    """Answer health queries as the command would, from memory once asked"""
+    args = ['health', '--allow-failures', 'job-0']
+    expected = invoke(*args)
+
+    assert invoke('--daemon', daemon.address, *args) == expected
+
+    fake.reset_stats()
+    assert invoke('--daemon', daemon.address, *args + ['-g']) != expected
+    assert invoke('--daemon', daemon.address, *args) == expected
+    assert fake.stats()['total_requests'] == 0
+
+
+def test_health_soft_limit(invoke, daemon):
+    """Apply soft limits to the builds kept"""
+    args = ['-s', '4', 'health', '--allow-failures', 'job-0']
+
+    assert invoke('--daemon', daemon.address, *args) == invoke(*args)
+
+
+def test_health_answers_kept(fake, daemon):
+    """Keep answers until the job is next updated"""
+    answer = daemon.health('job-0', True, 2, False, -1)
+
+    assert daemon.health('job-0', True, 2, False, -1) is answer
+    assert daemon.health('job-0', True, 2, True, -1) is not answer
+
+    daemon.update(('job-0', True))
+    assert daemon.health('job-0', True, 2, False, -1) is not answer
+
+
+def test_health_glob(invoke, daemon):
+    """Ask Jenkins about globs of jobs"""
+    args = ['health', '--allow-failures', 'job-0*']
+
+    assert invoke('--daemon', daemon.address, *args) == invoke(*args)
+    assert daemon.trees == {}
+
+
+def test_summary(invoke, fake, daemon):
+    """Answer summary queries as the command would"""
+    args = ['summary', '-s', '0.3', 'job-0', '3']
+    expected = invoke(*args)
+
+    assert invoke('--daemon', daemon.address, *args) == expected
+
+    fake.reset_stats()
+    assert invoke('--daemon', daemon.address, *args) == expected
+    assert fake.stats()['total_requests'] == 0
+
+
+def test_update(fake, daemon):
+    """Only visit builds not already visited"""
+    daemon.health('job-0', True, 2, False, -1)
+    fake.reset_stats()
+
+    daemon.update(('job-0', True))
+
+    assert 'testReport' not in fake.stats()['requests']
+
+
+def _share(monkeypatch, fake, numbers, ref):
+    """Make builds of job-0 also refer to a subbuild of another."""
+    build_data = fake.build_data
+
+    def sharing(name, number):
+        data = build_data(name, number)
+        if name == 'job-0' and number in numbers:
+            data['subBuilds'] = data['subBuilds'] + [{'jobName': ref[0], 'buildNumber': ref[1]}]
+
+        return data
+
+    monkeypatch.setattr(fake, 'build_data', sharing)
+
+
+@pytest.mark.parametrize('hard_limit', [50, 6])
+def test_update_shared(monkeypatch, invoke, fake, hard_limit):
+    """Count subbuilds shared with trees kept from an earlier refresh, or forgotten since, once"""
+    _share(monkeypatch, fake, [5, 7], ('job-0.0', 1))
+    args = ['-l', str(hard_limit), 'health', '--allow-failures', 'job-0']
+    o = Obj(fake.url, None, None, 'threads', None, 256, True, None, dict(CONFIG, hard_limit=hard_limit))
+
+    with Daemon(o.client, o.make_runner(soft_limit=-1), o.make_runner(), o.cache, fake.url, o.config) as daemon:
+        daemon.health('job-0', True, 2, False, -1)
+        with fake.lock:
+            for job in fake.tree_jobs('job-0'):
+                fake.triggered[(job, 7)] = (None, time.time() - 60) # Finished
+
+        daemon.update(('job-0', True))
+
+        assert invoke('--daemon', daemon.address, *args) == invoke(*args)
+
+
+def test_visits():
+    """Visit again trees which shared subbuilds with those forgotten, or with newer ones"""
+    visits = _Visits()
+    visits.claimed = {3: {'a', 'b'}, 2: {'c'}, 1: {'d'}}
+    visits.referred = {3: {'a', 'b'}, 2: {'b', 'c'}, 1: {'c', 'd'}}
+
+    assert visits.forget([3]) == [2, 1]
+    assert visits.claimed == {} and visits.referred == {}
+
+    visits.claimed = {4: {'a', 'c'}, 3: {'a'}, 2: {'c'}, 1: {'d'}}
+    assert visits.overlapping([4, 3, 2, 1]) == [3, 2]
+    assert visits.visited([4, 1]) == {(None, 'a'), (None, 'c'), (None, 'd')}
+
+
+def test_other_settings(invoke, daemon):
+    """Ask Jenkins if the daemon serves other settings, or is down"""
+    args = ['-b', 'master', 'health', '--allow-failures', 'job-0']
+    expected = invoke(*args)
+
+    assert invoke('--daemon', daemon.address, *args) == expected
+    assert daemon.trees == {}
+
+    daemon.stop()
+    assert invoke('--daemon', daemon.address, *args) == expected
@@ -0,0 +1,104 @@
+import json
+import time
+import pytest
+from jenkinsapi.jenkins import Jenkins
+from myjenkins import fetch
+from myjenkins.picker import Branch, Revision
+from myjenkins.testing.fake_server import FakeJenkins
+
+
+@pytest.fixture
+def fake():
+    """Fixture. Returns a running fake Jenkins server."""
+    with FakeJenkins(builds=30, fan_out=(2, )) as fake:
+        yield fake
+
+
+def test_iter_builds(fake):
+    """List builds and their statuses a page at a time"""
+    job = Jenkins(fake.url)['job-0']
+    fake.reset_stats()
+
+    builds = list(fetch.iter_builds(job, page_size=20))
+
+    assert [b.buildno for b in builds] == list(range(30, 0, -1))
+    assert not any(b.is_running() for b in builds)
+    assert set(b.get_status() for b in builds) <= set(['SUCCESS', 'UNSTABLE'])
+    assert fake.stats()['requests'] == {'job': 2}
+
+
+def test_iter_builds_read_ahead(fake):
+    """Fetch the next, bigger, page while a page is used, and no more once done"""
+    job = Jenkins(fake.url)['job-0']
+    fake.reset_stats()
+
+    builds = fetch.iter_builds(job, page_size=5)
+    assert [next(builds).buildno for _ in range(5)] == [30, 29, 28, 27, 26]
+
+    for _ in range(100):
+        if fake.stats()['requests'].get('job') == 2:
+            break
+        time.sleep(0.01)
+
+    builds.close()
+    time.sleep(0.05)
+    assert fake.stats()['requests'] == {'job': 2}
+
+    fake.reset_stats()
+    assert len(list(fetch.iter_builds(job, page_size=5))) == 30
+    assert fake.stats()['requests'] == {'job': 3} # 5, 10, then 20 builds
+
+
+def test_get_build_metadata(fake):
+    """Fetch only the fields used to visit a build"""
+    job = Jenkins(fake.url)['job-0.1']
+    fake.reset_stats()
+
+    build = fetch.get_build_metadata(job, 4)
+
+    assert str(build) == 'job-0.1 #4'
+    assert Branch().pick(build) == 'feature/a'
+    assert Revision().pick(build) == fake.build_data('job-0.1', 4)['actions'][1]['lastBuiltRevision']['SHA1']
+    assert build.has_resultset()
+    assert not build.is_running()
+    assert fake.stats()['requests'] == {'build': 1}
+    assert fake.stats()['bytes']['build'] < 1000
+
+
+@pytest.mark.parametrize('vcs,changes,action,revision', [
+    ('svn', {'revisions': [{'module': 'trunk', 'revision': 1240}, {'module': 'lib', 'revision': 1236}]}, {}, 1240),
+    ('hg', {}, {'mercurialNodeName': 'f00dfeed'}, 'f00dfeed'),
+])
+def test_get_build_metadata_vcs(fake, monkeypatch, vcs, changes, action, revision):
+    """Fetch what the revisions of builds checked out from other VCSs than git are read from"""
+    build_data = fake.build_data
+
+    def other_vcs(name, number):
+        data = build_data(name, number)
+        data['changeSet'] = dict(changes, kind=vcs, items=[])
+        data['actions'] = [a for a in data['actions'] if 'lastBuiltRevision' not in a] + [dict(action)]
+        return data
+
+    monkeypatch.setattr(fake, 'build_data', other_vcs)
+    build = fetch.get_build_metadata(Jenkins(fake.url)['job-0.1'], 4)
+
+    assert Revision().pick(build) == revision
+
+
+def test_get_test_results(fake):
+    """Fetch only the fields used from test cases, and stack traces when asked for"""
+    job = Jenkins(fake.url)['job-0.0']
+    build = fetch.get_build_metadata(job, 3)
+    fake.reset_stats()
+
+    results = fetch.get_test_results(build)
+    failed = [r for r in results if r.status == 'FAILED']
+
+    assert [r.identifier() for r in results] == \
+        ['{className}.{name}'.format(**case) for case in fake.cases('job-0.0', 3)]
+    assert fake.stats()['requests'] == {'testReport': 1}
+    assert fake.stats()['bytes']['testReport'] < len(json.dumps(fake.cases('job-0.0', 3))) / 4
+
+    assert failed and all(r.errorStackTrace.startswith('java.lang.AssertionError') for r in failed)
+    assert all(r.errorStackTrace is None for r in results if r.status == 'PASSED')
+    assert fake.stats()['requests'] == {'testReport': 2}
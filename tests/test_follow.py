@@ -0,0 +1,114 @@
+import time
+import pytest
+from jenkinsapi.utils.requester import Requester
+from myjenkins.actions import find_recent_builds
+from myjenkins.aggregate import FLAKES, FlakyAggregates
+from myjenkins import follow
+from myjenkins.follow import Follower
+from myjenkins import report
+from myjenkins.runner import Runner
+from myjenkins.session import Client
+from myjenkins.visitor import ExtendedTestCollector
+
+
+def _aggregate(client, runner):
+    vi = ExtendedTestCollector(client, dedupe=True)
+    builds = list(find_recent_builds(client['job-0'], allow_failures=True))
+
+    runs = [report.test_run(result) for result in runner.run(vi, builds)]
+
+    return FlakyAggregates.of(runs, last_build=builds[0].buildno, builds=vi.matches,
+                              subbuilds=(ref for _, ref in vi.visited))
+
+
+def _trigger(fake, number, started=None):
+    with fake.lock:
+        for job in fake.tree_jobs('job-0'):
+            fake.triggered[(job, number)] = (None, started or time.time()) # Passing all of its tests
+
+
+@pytest.mark.parametrize('fake', [dict(build_duration=0.3)], indirect=True) # New builds take a while
+def test_update(fake):
+    """Merge in the runs of builds once they finish, checking for them in one request"""
+    client = Client(fake.url, requester=Requester(baseurl=fake.url), lazy=True)
+    runner = Runner(concurrency=4)
+    follower = Follower(client, runner, None, 'job-0', _aggregate(client, runner), allow_failures=True)
+
+    _trigger(fake, 7)
+    fake.reset_stats()
+    assert follower.update() == []
+    assert fake.stats()['total_requests'] == 1
+
+    time.sleep(0.3)
+    changes = follower.update()
+
+    assert changes and all(new[FLAKES] > (old or [0] * 5)[FLAKES] for _, old, new in changes)
+    assert follower.aggregates.groups == _aggregate(client, runner).groups
+    assert follower.aggregates.last_build == 7
+
+    fake.reset_stats()
+    assert follower.update() == []
+    assert fake.stats()['total_requests'] == 1
+
+
+def test_update_fails(fake, monkeypatch):
+    """Visit builds again on the next update if visiting them failed"""
+    client = Client(fake.url, requester=Requester(baseurl=fake.url), lazy=True)
+    runner = Runner(concurrency=4)
+    follower = Follower(client, runner, None, 'job-0', _aggregate(client, runner), allow_failures=True)
+    _trigger(fake, 7)
+
+    def fail(visitor, builds):
+        raise ConnectionError('Jenkins is down')
+
+    with monkeypatch.context() as m:
+        m.setattr(runner, 'run', fail)
+        with pytest.raises(ConnectionError):
+            follower.update()
+
+    assert follower.update()
+    assert follower.aggregates.groups == _aggregate(client, runner).groups
+    assert follower.aggregates.last_build == 7
+
+
+@pytest.mark.parametrize('fake', [dict(build_duration=0.3)], indirect=True)
+def test_update_long_running(fake, monkeypatch):
+    """Merge in the runs of a build which finishes after newer builds have pushed it out of the listing"""
+    monkeypatch.setattr(follow, 'POLL_TREE', 'builds[number,building]{0,2}')
+    client = Client(fake.url, requester=Requester(baseurl=fake.url), lazy=True)
+    runner = Runner(concurrency=4)
+    follower = Follower(client, runner, None, 'job-0', _aggregate(client, runner), allow_failures=True)
+
+    _trigger(fake, 7)
+    for number in [8, 9]:
+        _trigger(fake, number, started=time.time() - 1)
+
+    assert follower.update()
+    assert (follower.last, follower.running) == (9, set([7]))
+
+    time.sleep(0.3)
+    follower.update()
+
+    assert follower.running == set()
+    assert follower.aggregates.groups == _aggregate(client, runner).groups
+
+
+def test_update_shared(fake, monkeypatch):
+    """Count a subbuild which a new build shares with one already merged once"""
+    client = Client(fake.url, requester=Requester(baseurl=fake.url), lazy=True)
+    runner = Runner(concurrency=4)
+    follower = Follower(client, runner, None, 'job-0', _aggregate(client, runner), allow_failures=True)
+    build_data = fake.build_data
+
+    def sharing(name, number):
+        data = build_data(name, number)
+        if name == 'job-0' and number == 7:
+            data['subBuilds'] = data['subBuilds'] + [{'jobName': 'job-0.0', 'buildNumber': 6}]
+
+        return data
+
+    monkeypatch.setattr(fake, 'build_data', sharing)
+    _trigger(fake, 7)
+    follower.update()
+
+    assert follower.aggregates.runs == _aggregate(client, runner).runs
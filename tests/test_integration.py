@@ -0,0 +1,210 @@
+import json
+import time
+import pytest
+from click.testing import CliRunner
+from myjenkins.__main__ import myjenkins
+from myjenkins.testing.fake_server import EPOCH
+
+
+def test_health(invoke):
+    """Report flaky tests"""
+    output = invoke('health', '--allow-failures', 'job-0')
+
+    assert 'Found 25 flaky tests (of 40 total tests)' in output
+    assert 'from 12 builds' in output
+
+
+def test_health_many(invoke, fake):
+    """Report on many jobs at once, visiting their shared subbuilds once"""
+    invoke('--no-cache', 'health', '--allow-failures', 'job-0.0')
+    expected = invoke('--no-cache', 'health', '--allow-failures', 'job-0')
+    separately = fake.stats()['total_requests']
+
+    fake.reset_stats()
+    output = invoke('--no-cache', 'health', '--allow-failures', 'job-0', 'job-0.0')
+
+    assert output == expected # job-0.0's builds are all subbuilds of job-0's
+    assert fake.stats()['total_requests'] < separately
+
+    output = invoke('health', '--allow-failures', '--per-job', 'job-0.*')
+    assert 'job-0.0: Found' in output and 'job-0.1: Found' in output
+
+
+def test_health_per_job(invoke):
+    """Report on each job as if on its own, though some are subbuilds of another"""
+    jobs = ['job-0', 'job-0.0']
+    expected = ''.join('{0}: {1}'.format(job, invoke('health', '--allow-failures', job)) for job in jobs)
+
+    assert invoke('health', '--allow-failures', '--per-job', *jobs) == expected
+
+
+def test_health_from_file(invoke, fake, tmpdir):
+    """Report again on test runs written to a file, without asking Jenkins"""
+    path = str(tmpdir.join('runs.npz'))
+    expected = invoke('health', '--allow-failures', '--dump', path, 'job-0')
+
+    fake.reset_stats()
+    assert invoke('health', '--from-file', path) == expected
+    assert invoke('health', '--from-file', path, '--group-by-test') != expected
+    assert 'job-0: Found 25' in invoke('health', '--from-file', path, '--per-job', 'job-*')
+    assert fake.stats()['total_requests'] == 0
+
+
+def test_health_dump_path(invoke, tmpdir):
+    """Write test runs exactly where asked, whatever the extension"""
+    path = str(tmpdir.join('runs.bin'))
+    expected = invoke('health', '--allow-failures', '--dump', path, 'job-0')
+
+    assert not tmpdir.join('runs.bin.npz').exists()
+    assert invoke('health', '--from-file', path) == expected
+
+
+def test_health_stream(invoke, tmpdir):
+    """Report the same with test runs aggregated as they are collected"""
+    expected = invoke('health', '--allow-failures', 'job-0')
+
+    assert invoke('health', '--allow-failures', '--stream', 'job-0') == expected
+    assert invoke('health', '--allow-failures', '--incremental', str(tmpdir.join('state.json')), 'job-0') == expected
+
+
+@pytest.mark.parametrize('fake', [dict(build_duration=0.5)], indirect=True)
+def test_health_incremental_running(fake, invoke, tmpdir):
+    """Visit builds which were still running on the last incremental run once they have finished"""
+    path = str(tmpdir.join('state.json'))
+    with fake.lock:
+        for job in fake.tree_jobs('job-0'):
+            fake.triggered[(job, 7)] = (None, time.time()) # Running
+            fake.triggered[(job, 8)] = (None, time.time() - 60) # Finished
+
+    assert 'from 14 builds' in invoke('health', '--allow-failures', '--incremental', path, 'job-0')
+    assert json.load(open(path))['pending'] == [7]
+
+    time.sleep(0.5)
+    output = invoke('health', '--allow-failures', '--incremental', path, 'job-0')
+
+    assert 'based on 320 test runs from 16 builds' in output
+    assert json.load(open(path))['pending'] == []
+    assert 'from 16 builds' in invoke('health', '--allow-failures', '--incremental', path, 'job-0')
+
+
+def test_health_incremental_limits(fake, invoke, tmpdir):
+    """Visit every build since the last incremental run, however many, and only with the same filters"""
+    path = str(tmpdir.join('state.json'))
+    assert 'from 4 builds' in invoke('--hard-limit', '2', 'health', '--allow-failures', '--incremental', path, 'job-0')
+
+    with fake.lock:
+        for number in (7, 8, 9):
+            for job in fake.tree_jobs('job-0'):
+                fake.triggered[(job, number)] = (None, time.time() - 60) # Finished
+
+    assert 'from 10 builds' in invoke('--hard-limit', '1', 'health', '--allow-failures', '--incremental', path,
+                                      'job-0')
+
+    result = CliRunner().invoke(myjenkins, ['--hostname', fake.url, '--branch', 'master', 'health',
+                                            '--allow-failures', '--incremental', path, 'job-0'])
+    assert result.exit_code != 0 and "not branch='master'" in result.output
+    assert json.load(open(path))['last_build'] == 9
+
+
+@pytest.mark.parametrize('option,hint', [(['--dump', 'runs.npz'], 'dump'), (['--per-job'], 'per_job')])
+def test_health_incremental_options(fake, tmpdir, option, hint):
+    """Refuse options which incremental runs would ignore, before asking Jenkins"""
+    result = CliRunner().invoke(myjenkins, ['--hostname', fake.url, 'health', '--incremental',
+                                            str(tmpdir.join('state.json'))] + option + ['job-0'])
+
+    assert result.exit_code != 0 and 'Invalid value for {0}'.format(hint) in result.output
+    assert fake.stats()['total_requests'] == 0
+
+
+@pytest.mark.parametrize('fake', [dict(jobs=2, shared_repo=True)], indirect=True)
+def test_health_stream_many(invoke):
+    """Report the same, streaming, on jobs running the same tests"""
+    expected = invoke('health', '--allow-failures', 'job-0', 'job-1')
+
+    assert invoke('health', '--allow-failures', '--stream', 'job-0', 'job-1') == expected
+    assert invoke('health', '--allow-failures', '--stream', 'job-1', 'job-0') == expected
+
+
+def test_summary(invoke):
+    """List failed tests with their stacktraces"""
+    output = invoke('summary', 'job-0', '3')
+
+    assert 'com.example.job-0_0.Test1.test5' in output
+    assert 'AssertionError' in output
+
+
+def test_summary_branch(invoke):
+    """Summarise the build asked for whatever branch is required of health's trees"""
+    assert invoke('-b', 'nosuchbranch', 'summary', 'job-0', '3') == invoke('summary', 'job-0', '3')
+
+
+def test_retry(invoke):
+    """Rerun failed tests until they pass"""
+    output = invoke('retry', 'job-0', '3')
+
+    assert 'Retrying job-0 #3 (attempt 1 of 3; 3 tests still failing)' in output
+    assert 'Success' in output
+
+
+def test_retry_also_job(fake):
+    """Refuse other jobs without --failed-within, before asking Jenkins"""
+    result = CliRunner().invoke(myjenkins, ['--hostname', fake.url, 'retry', '--also-job', 'job-1', 'job-0', '3'])
+
+    assert result.exit_code != 0 and '--failed-within' in result.output
+    assert fake.stats()['total_requests'] == 0
+
+
+@pytest.mark.parametrize('fake', [dict(jobs=2)], indirect=True)
+def test_retry_failed_within(monkeypatch, invoke, fake):
+    """Retry the builds of each job which failed within the window, and only those"""
+    results = {('job-0', 6): 'FAILURE', ('job-0', 5): 'UNSTABLE', ('job-0', 2): 'FAILURE', ('job-1', 4): 'UNSTABLE'}
+    build_data = fake.build_data
+
+    def failing(name, number):
+        data = build_data(name, number)
+        data['result'] = results.get((name, number), data['result'])
+        return data
+
+    monkeypatch.setattr(fake, 'build_data', failing)
+    hours = (time.time() - EPOCH / 1000.0) / 3600 - 3.5 # Builds #4 onwards
+    output = invoke('retry', '--poll-rate', '100', '--failed-within', str(hours), '--also-job', 'job-1', 'job-0')
+
+    assert sorted(line.split(':')[0] for line in output.splitlines() if ': Success' in line) == \
+        ['job-0 #5', 'job-0 #6', 'job-1 #4']
+    assert 'job-0 #2' not in output
+
+
+def test_stats(invoke, fake, tmpdir):
+    """Count the requests made to Jenkins by endpoint"""
+    path = tmpdir.join('stats.json')
+    invoke('--stats-json', str(path), 'health', '--allow-failures', 'job-0')
+    stats = json.loads(path.read())
+
+    assert sum(r['count'] for r in stats['requests'].values()) == fake.stats()['total_requests']
+    assert stats['requests']['testReport']['count'] == 12
+    assert 'collect results' in stats['phases']
+
+
+def test_help(invoke, fake):
+    """Show a command's help without contacting Jenkins"""
+    output = invoke('health', '--help')
+
+    assert 'Identify flaky tests' in output
+    assert fake.stats()['total_requests'] == 0
+
+
+def test_retry_many(invoke):
+    """Rerun failed tests of several builds at once"""
+    output = invoke('retry', '--poll-rate', '100', 'job-0', '3', '5')
+
+    assert 'Retrying job-0 #3 (attempt 1 of 3;' in output
+    assert 'Retrying job-0 #5 (attempt 1 of 3;' in output
+    assert 'job-0 #3: Success' in output
+    assert 'job-0 #5: Success' in output
+
+
+def test_summary_artifacts(invoke):
+    """List artifacts of the subbuild each failed test ran in"""
+    output = invoke('summary', '--similarity', '0.3', 'job-0', '3')
+
+    assert '/job/job-0.0/3/artifact/reports/job-0.0/Test1.html' in output
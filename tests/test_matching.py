@@ -0,0 +1,39 @@
+import pytest
+import random
+import string
+from collections import namedtuple
+from difflib import SequenceMatcher
+from myjenkins.matching import ArtifactIndex
+
+Artifact = namedtuple('Artifact', ['filename'])
+
+
+def _brute_force(ratios, similarity, limit):
+    return sorted([(r, a) for r, a in ratios if r > similarity], key=lambda r: (-r[0], r[1].filename))[:limit]
+
+
+def _name(rng, alphabet):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+
+
+@pytest.mark.parametrize('alphabet', ['abcTest_.', string.ascii_letters + '_.'])
+def test_matches_brute_force(alphabet):
+    """Find the same artifacts as comparing every name"""
+    rng = random.Random(0)
+    artifacts = [Artifact(_name(rng, alphabet)) for _ in range(150)]
+    index = ArtifactIndex(artifacts)
+
+    for _ in range(30):
+        name = _name(rng, alphabet)
+        ratios = [(SequenceMatcher(a=name, b=a.filename, autojunk=False).ratio(), a) for a in artifacts]
+
+        for similarity in [-1, 0, 0.3, 0.6, 0.9, 1]:
+            for limit in [-1, 0, 1, 2, 10]:
+                assert index.similar(name, similarity, limit) == _brute_force(ratios, similarity, limit)
+
+
+def test_similar():
+    """Find test reports named after a test"""
+    index = ArtifactIndex([Artifact('testFoo.html'), Artifact('testBar.html'), Artifact('screenshot.png')])
+
+    assert [a.filename for _, a in index.similar('testFoo', 0.6, 2)] == ['testFoo.html']
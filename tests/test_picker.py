@@ -42,3 +42,44 @@ def test_revision():
     picker = Revision('foo')
     picker.evaluate(build)
     assert picker.has_match
+
+
+def test_ruled_out():
+    """Rule out a match once a different branch is picked"""
+    build = create_build('a')
+    build.get_params.return_value = {'BRANCH_NAME': 'bar'}
+
+    picker = Branch('foo')
+    picker.evaluate(build)
+    assert not picker.has_match
+    assert not picker.can_match
+
+
+def test_not_ruled_out_by_checkout():
+    """Only rule out a branch passed down as BRANCH_NAME, not the branch or revision checked out"""
+    build = create_build('a')
+    build._get_git_rev_branch.return_value = [{'name': 'origin/bar'}]
+    build.get_revision.return_value = 'bar'
+
+    for picker in (Branch('foo'), Revision('foo')):
+        picker.evaluate(build)
+        assert not picker.has_match
+        assert picker.can_match
+
+
+def test_not_ruled_out():
+    """Pickers which are not inherited can still match"""
+    c = DummyPicker('foo')
+    c.evaluate('bar')
+
+    assert c.can_match
+
+
+def test_evaluated():
+    """Return a changed copy, leaving the picker as it was"""
+    c = DummyPicker()
+    evaluated = c.evaluated('foo')
+
+    assert evaluated.has_match and not c.has_match
+    assert evaluated.evaluated('bar') is evaluated
+    assert "found_value='foo'" in repr(evaluated)
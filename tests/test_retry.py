@@ -0,0 +1,25 @@
+import pytest
+from myjenkins import fetch, visitor
+from myjenkins.__main__ import Obj
+from myjenkins.retry import RetryLoop, run_retries
+
+
+@pytest.mark.parametrize('fake', [dict(jobs=2)], indirect=True)
+def test_run_retries(fake):
+    """Retry builds of several jobs at once, each in its own job, and carry on past one which errs"""
+    o = Obj(fake.url, None, None, 'threads', None, 256, True, None, {})
+    jobs = [o.client['job-0'], o.client['job-1']]
+    builds = [(job, fetch.get_build_metadata(job, number)) for job in jobs for number in [3, 5]]
+
+    def failed_classes(build):
+        if build is builds[-1][1]:
+            raise ValueError('unreadable')
+
+        return set(r.className for r in visitor.FailedTestCollector(o.client).visit(build))
+
+    loops = run_retries([RetryLoop(job, build, 3) for job, build in builds], failed_classes, 4, 0.01, 1000)
+
+    assert [loop.report().split(':')[0] for loop in loops] == ['Success'] * 3 + ['Error']
+    assert all(loop.attempts == 1 for loop in loops[:3])
+    assert sorted(loop.current.job.name for loop in loops[:3]) == ['job-0', 'job-0', 'job-1']
+    assert sorted(job for job, _ in fake.triggered if '.' not in job) == ['job-0', 'job-0', 'job-1']
@@ -1,4 +1,6 @@
-from myjenkins.runner import Runner
+import threading
+import pytest
+from myjenkins.runner import Runner, AsyncRunner
 from myjenkins.visitor import SubbuildCollector
 
 
@@ -10,3 +12,84 @@ def test_runner(client):
         client['sub_1'][1],
         client['sub_2'][1]
     ])
+
+
+def test_async_runner(client):
+    visitor = SubbuildCollector(client)
+    results = AsyncRunner().run(visitor, [client['top'][1]])
+
+    assert set(results) == set([
+        client['sub_1'][1],
+        client['sub_2'][1]
+    ])
+
+
+def test_async_runner_soft_limit(client):
+    """Stop starting new trees once enough matches were found"""
+    visitor = SubbuildCollector(client)
+    results = list(AsyncRunner(soft_limit=1, concurrency=1).run(visitor, [client['top'][1]] * 3, flatten=False))
+
+    assert len(results) == 1
+
+
+def test_runner_preserves_tree_order(client):
+    """Collect each tree in depth-first order, whichever worker visited it"""
+    visitor = SubbuildCollector(client)
+    buckets = list(Runner(concurrency=4).run(visitor, [client['top'][1]] * 3, flatten=False))
+
+    assert buckets == [[client['sub_1'][1], client['sub_2'][1]]] * 3
+
+
+def test_runner_soft_limit(client):
+    """Stop starting new trees once enough matches were found"""
+    visitor = SubbuildCollector(client)
+    results = list(Runner(soft_limit=1, concurrency=1).run(visitor, [client['top'][1]] * 3, flatten=False))
+
+    assert len(results) == 1
+
+
+class BlockedFirstTree(SubbuildCollector):
+    """Blocks on the first root until released, and marks its results."""
+
+    def __init__(self, client):
+        super(BlockedFirstTree, self).__init__(client)
+        self.roots = 0
+        self.release = threading.Event()
+
+    def step(self, build, state):
+        results, refs = super(BlockedFirstTree, self).step(build, state)
+        with self.lock:
+            first = state.depth == 0 and self.roots == 0
+            self.roots += state.depth == 0
+
+        if first:
+            self.release.wait()
+            return ['first'] + results, refs
+
+        return results, refs
+
+
+@pytest.mark.parametrize('runner', [Runner, AsyncRunner])
+@pytest.mark.parametrize('ahead', [-1, 0, 2])
+def test_runner_ahead(client, runner, ahead):
+    """Only start trees while few have finished ahead of the oldest unfinished one"""
+    vi = BlockedFirstTree(client)
+    held = 19 if ahead < 0 else ahead + 1 # Trees which finish while the first is blocked
+    buckets, received = [], threading.Semaphore(0)
+
+    def consume():
+        for bucket in runner(concurrency=2).run(vi, [client['top'][1]] * 20, flatten=False, ahead=ahead):
+            buckets.append(bucket)
+            received.release()
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    try:
+        assert all(received.acquire(timeout=10) for _ in range(held))
+        assert vi.roots == held + 1 # Those finished, and the first
+    finally:
+        vi.release.set()
+        thread.join()
+
+    assert len(buckets) == 20
+    assert [i for i, bucket in enumerate(buckets) if 'first' in bucket] == [held]
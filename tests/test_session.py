@@ -0,0 +1,46 @@
+import pytest
+from requests.exceptions import HTTPError
+from jenkinsapi.utils.requester import Requester
+from myjenkins import fetch
+from myjenkins.session import Client, configure_pool
+from myjenkins.testing.fake_server import FakeJenkins
+
+
+def _client(fake, size=4):
+    client = Client(fake.url, requester=Requester(baseurl=fake.url), lazy=True)
+    configure_pool(client, size, backoff=0)
+
+    return client
+
+
+def test_get_job():
+    """Make each job object once"""
+    with FakeJenkins(builds=2) as fake:
+        client = _client(fake)
+
+        jobs = [client['job-0.1'], client['job-0.1'], client.get_job('job-0.1'), client['job-0.0']]
+
+        assert jobs[0] is jobs[1] is jobs[2]
+        assert fake.stats()['requests']['job'] == 2
+
+
+def test_retry():
+    """Retry reads which fail with server errors"""
+    with FakeJenkins(builds=2, error_rate=0.3) as fake:
+        client = _client(fake)
+
+        builds = [fetch.get_build_metadata(client['job-0'], n) for n in (1, 2) for _ in range(5)]
+
+        assert [b.buildno for b in builds] == [1] * 5 + [2] * 5
+        assert fake.stats()['requests']['build'] > 10
+
+
+def test_retry_gives_up():
+    """Raise once retries are used up"""
+    with FakeJenkins(builds=2, error_rate=1.0) as fake:
+        client = _client(fake)
+
+        with pytest.raises(HTTPError):
+            fetch.get_build_metadata(client['job-0'], 1)
+
+        assert fake.stats()['requests']['build'] == 4
@@ -0,0 +1,48 @@
+from mock import MagicMock
+from myjenkins.stats import Stats, classify, instrument
+
+
+def test_classify():
+    """Tell endpoints apart by URL"""
+    assert classify('GET', 'http://jenkins/api/python') == 'jobs'
+    assert classify('GET', 'http://jenkins/job/foo/api/python') == 'job'
+    assert classify('GET', 'http://jenkins/job/foo/api/python', {'tree': 'builds[number]'}) == 'job build list'
+    assert classify('GET', 'http://jenkins/job/foo/job/bar/12/api/python') == 'build metadata'
+    assert classify('GET', 'http://jenkins/job/foo/12/testReport/api/python') == 'testReport'
+    assert classify('GET', 'http://jenkins/job/foo/12/artifact/out/log.txt') == 'artifact'
+    assert classify('POST', 'http://jenkins/job/foo/12/submitDescription') == 'post'
+
+
+def test_summary():
+    """Summarise requests, phases and worker utilisation"""
+    stats = Stats()
+    stats.record('job', 0.02, 100, 200)
+    stats.record('job', 2.0, 50, 500)
+    stats.workers(4, 2.0, 1.0)
+
+    with stats.phase('find builds'):
+        pass
+
+    summary = stats.summary()
+
+    assert summary['requests']['job']['count'] == 2
+    assert summary['requests']['job']['errors'] == 1
+    assert summary['requests']['job']['bytes'] == 150
+    assert summary['requests']['job']['latency_histogram']['0.025'] == 1
+    assert summary['requests']['job']['latency_histogram']['2.5'] == 1
+    assert summary['phases']['find builds']['calls'] == 1
+    assert summary['worker_utilisation'] == 0.5
+    assert '2 requests' in stats.format()
+
+
+def test_instrument():
+    """Record requests made through a requester"""
+    stats = Stats()
+    requester = MagicMock()
+    requester.get_url.return_value = MagicMock(content=b'12345', status_code=200)
+
+    response = instrument(requester, stats).get_url('http://jenkins/job/foo/3/api/python', params={})
+
+    assert response.content == b'12345'
+    assert stats.requests['build metadata'] == 1
+    assert stats.bytes['build metadata'] == 5
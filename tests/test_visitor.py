@@ -1,7 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from mock import Mock
+from jenkinsapi.utils.requester import Requester
 from jenkinsapi.result import Result
 from myjenkins.picker import Branch, Revision
-from myjenkins.visitor import SubbuildCollector, TestCollector
+from myjenkins.session import Client
+from myjenkins.testing.fake_server import FakeJenkins
+from myjenkins.testing.jenkins_mocks import create_build, create_job
+from myjenkins.util import Memo
+from myjenkins.visitor import BranchState, SubbuildCollector, TestCollector
 
 
 def _add_tests(client):
@@ -65,3 +71,87 @@ def test_extract_with_requirements(client):
 
     assert set(t.name for t in TestCollector(client).visit(client['top'][1], requirements)) == \
         set(['bar'])
+
+
+def test_prune_unsatisfiable(client):
+    """Skip subbuilds of a build on another branch"""
+    _add_tests(client)
+    _add_requirements(client)
+
+    v = TestCollector(client)
+
+    assert v.visit(client['top'][1], [Branch('bar')]) == []
+    assert not client['sub_1'][1].get_resultset.called
+    assert v.matches == 0
+
+
+def test_match_below_checkout(client):
+    """Match subbuilds whose root checked out another branch and revision"""
+    _add_tests(client)
+    client['top'][1]._get_git_rev_branch.return_value = [{'name': 'origin/master'}]
+    client['top'][1].get_revision.return_value = 'pipeline'
+    client['sub_1'][1].get_params.return_value = {'BRANCH_NAME': 'master'}
+    client['sub_1'][1].get_revision.return_value = 'match-me'
+    client['sub_2'][1].get_params.return_value = {'BRANCH_NAME': 'master'}
+    client['sub_2'][1].get_revision.return_value = 'other'
+
+    requirements = [Branch('master'), Revision('match-me')]
+
+    assert [t.name for t in TestCollector(client).visit(client['top'][1], requirements)] == ['bar']
+
+
+def test_dedupe_shared_subbuilds(client):
+    """Collect shared subbuilds once, and not the results of a pipeline whose subbuilds were visited already"""
+    _add_tests(client)
+    client._jobs['other'] = create_job('other')
+    client['other']._builds = {1: create_build(1)}
+    client['other'][1]._data = dict(client['top'][1]._data)
+    client['other'][1].get_resultset = client['top'][1].get_resultset
+
+    v = TestCollector(client, dedupe=True)
+    names = [t.name for build in v.unvisited([client['top'][1], client['other'][1]]) for t in v.visit(build)]
+
+    assert sorted(names) == ['bar', 'baz']
+    assert v.matches == 2
+
+
+def test_advance_shares_state(client):
+    """Share resolved pickers with the parent state instead of copying them"""
+    _add_requirements(client)
+    requirements = [Branch('foo')]
+
+    top = BranchState(requirements).advance(client['top'][1])
+    sub = top.advance(client['sub_1'][1])
+
+    assert top.requirements[0].has_match
+    assert sub.requirements is top.requirements
+    assert not requirements[0].has_match
+
+
+def test_memo_keeps_recent():
+    """Keep only the most recently made values, if asked to"""
+    memo, made = Memo(keep=2), []
+    for key in [1, 2, 3, 3, 1]:
+        memo.get(key, made.append, key)
+
+    assert made == [1, 2, 3, 1]
+    assert len(memo) == 2
+
+
+def test_fetch_once():
+    """Fetch a build, or its results, once however many threads ask for it at the same time"""
+    with FakeJenkins(builds=2, latency=0.05) as fake:
+        client = Client(fake.url, requester=Requester(baseurl=fake.url), lazy=True)
+        v = TestCollector(client)
+        client['job-0.0'] # Made before the race, so only builds are requested
+
+        with ThreadPoolExecutor(8) as executor:
+            builds = list(executor.map(v.fetch, [('job-0.0', 1)] * 8 + [('job-0.0', 2)] * 8))
+            results = list(executor.map(lambda b: list(v.collect(b, v.start(b))), [builds[0]] * 8))
+
+        assert len(set(map(id, builds))) == 2
+        assert v.fetch(('job-0.0', 2)) is builds[-1]
+        assert fake.stats()['requests']['build'] == 2
+
+        assert len(results[0]) == fake.tests and all(r == results[0] for r in results)
+        assert fake.stats()['requests']['testReport'] == 1
@@ -0,0 +1,62 @@
+import asyncio
+from mock import Mock
+from myjenkins.watcher import Watch, Watcher
+
+
+def _run(watcher, *waits):
+    async def main():
+        async def call(f, *args):
+            return f(*args)
+
+        watching = asyncio.ensure_future(watcher.run(call))
+        try:
+            return await asyncio.gather(*(f(watcher) for f in waits))
+        finally:
+            watching.cancel()
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def _job(builds):
+    job = Mock(baseurl='http://jenkins/job/foo')
+    job.name = 'foo'
+    job.python_api_url = lambda url: url + '/api/python'
+    job.get_data = Mock(side_effect=lambda url, tree: {'builds': builds.pop(0)})
+
+    return job
+
+
+def test_started():
+    """Wait for a queue item to start a build"""
+    queued = Mock()
+    queued.poll.side_effect = [{}, {'executable': None}, {'executable': {'number': 7}}]
+
+    assert _run(Watcher(min_interval=0.01, rate=1000), lambda w: w.started(queued)) == [7]
+    assert queued.poll.call_count == 3
+
+
+def test_finished_together():
+    """Check on all the builds of a job in one request"""
+    job = _job([
+        [{'number': 2, 'building': True}, {'number': 1, 'building': False, 'result': 'SUCCESS'}],
+        [{'number': 2, 'building': False, 'result': 'FAILURE'}, {'number': 1, 'result': 'SUCCESS'}],
+    ])
+
+    results = _run(Watcher(min_interval=0.01, rate=1000), lambda w: w.finished(job, 1), lambda w: w.finished(job, 2))
+
+    assert results == ['SUCCESS', 'FAILURE']
+    assert job.get_data.call_count == 2
+
+
+def test_backoff():
+    """Wait until a build is expected to finish, then back off"""
+    watcher = Watcher(min_interval=1, max_interval=3)
+    watch = Watch(None, watcher.min_interval)
+
+    assert watcher._delay(watch, 2.5) == 2.5
+    assert watcher._delay(watch, 100) == 3
+    assert [watcher._delay(watch, -1) for _ in range(4)] == [1, 1.5, 2.25, 3]